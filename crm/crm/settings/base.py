@@ -1,4 +1,6 @@
 import os
+import tempfile
+from pathlib import Path
 
 from . import BASE_DIR
 
@@ -183,6 +185,89 @@ REDIS_HOST = os.environ.get("REDIS_HOST")
 REDIS_PORT = os.environ.get("REDIS_PORT")
 REDIS_NAME = os.environ.get("REDIS_NAME")
 
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": f"redis://{REDIS_HOST}:{REDIS_PORT}/1",
+    }
+}
+
+# File downloader
+# Directory the generated reports are written to
+FILE_DOWNLOADER_ROOT = Path(tempfile.gettempdir())
+# Internal nginx location serving FILE_DOWNLOADER_ROOT, files are sent
+# by Django when empty
+FILE_DOWNLOADER_ACCEL_REDIRECT_URL = os.environ.get(
+    "FILE_DOWNLOADER_ACCEL_REDIRECT_URL", ""
+)
+FILE_DOWNLOADER_CHUNK_SIZE = 64 * 1024
+FILE_DOWNLOADER_REPORT_CACHE_TIMEOUT = 60 * 60 * 24
+# Identical exports requested while a task is in flight attach to it
+FILE_DOWNLOADER_SINGLE_FLIGHT_TIMEOUT = 60 * 10
+# Templates parsed by every worker process on start
+FILE_DOWNLOADER_TEMPLATES_DIR = MEDIA_ROOT / "docx"
+# Generated files older than the TTL or over the quota (oldest first) are
+# removed by the periodic reaper
+FILE_DOWNLOADER_OUTPUT_DIR = FILE_DOWNLOADER_ROOT / "reports"
+# Alias of the storage of generated files in STORAGES
+FILE_DOWNLOADER_STORAGE = "file_downloader"
+FILE_DOWNLOADER_OUTPUT_TTL = 60 * 60 * 6
+FILE_DOWNLOADER_OUTPUT_QUOTA = 1024**3
+FILE_DOWNLOADER_REAP_INTERVAL = 60 * 15
+# Remove a file once it has been sent by Django. Files are then built for
+# every request, the report cache and the attaching to identical tasks in
+# flight are turned off, as another client could still download the file
+FILE_DOWNLOADER_DELETE_AFTER_DOWNLOAD = False
+# Server-sent events with the status of a task, the browser reconnects
+# after the timeout
+FILE_DOWNLOADER_EVENTS_TIMEOUT = 60
+FILE_DOWNLOADER_EVENTS_KEEPALIVE = 15
+# Threads of the web process building small documents without Celery,
+# 0 disables inline building
+FILE_DOWNLOADER_INLINE_WORKERS = 2
+FILE_DOWNLOADER_INLINE_TIMEOUT = 10
+# Large sectioned documents are rendered in parallel by up to PARTS tasks
+# of at least PART_ROWS rows each and merged
+FILE_DOWNLOADER_DOCX_PARTS = int(
+    os.environ.get("FILE_DOWNLOADER_DOCX_PARTS", 4)
+)
+FILE_DOWNLOADER_DOCX_PART_ROWS = 200
+
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+    },
+    FILE_DOWNLOADER_STORAGE: {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {"location": FILE_DOWNLOADER_OUTPUT_DIR},
+    },
+}
+# Generated files are shared between hosts through an S3-compatible store
+# (requires django-storages and boto3)
+if os.environ.get("FILE_DOWNLOADER_S3_BUCKET"):
+    STORAGES[FILE_DOWNLOADER_STORAGE] = {
+        "BACKEND": "storages.backends.s3.S3Storage",
+        "OPTIONS": {
+            "bucket_name": os.environ["FILE_DOWNLOADER_S3_BUCKET"],
+            "endpoint_url": os.environ.get("FILE_DOWNLOADER_S3_ENDPOINT_URL"),
+            "access_key": os.environ.get("FILE_DOWNLOADER_S3_ACCESS_KEY"),
+            "secret_key": os.environ.get("FILE_DOWNLOADER_S3_SECRET_KEY"),
+            "file_overwrite": False,
+        },
+    }
+
+# Celery
+CELERY_RESULT_EXPIRES = FILE_DOWNLOADER_OUTPUT_TTL
+CELERY_BEAT_SCHEDULE = {
+    "reap-file-downloader-output": {
+        "task": "file_downloader.reap_output_store",
+        "schedule": FILE_DOWNLOADER_REAP_INTERVAL,
+    },
+}
+
 
 # Breadcrumbs
 DYNAMIC_BREADCRUMBS_PATH_MAX_DEPTH = 10
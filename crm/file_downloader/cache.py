@@ -0,0 +1,130 @@
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Optional
+
+from celery.result import AsyncResult
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+
+from file_downloader.storage import OutputStore
+
+
+class ReportCache:
+    """Task ids of built reports addressed by the template, the task
+    kwargs and the version of the data, so identical exports are reused"""
+
+    prefix = "file_downloader:report"
+
+    def __init__(
+        self, alias: str = "default", timeout: Optional[int] = None
+    ) -> None:
+        self.__cache = caches[alias]
+        if timeout is None:
+            timeout = settings.FILE_DOWNLOADER_REPORT_CACHE_TIMEOUT
+        self.__timeout = timeout
+
+    @staticmethod
+    def get_template_version(template_file_path) -> Optional[tuple]:
+        try:
+            stat = Path(template_file_path).stat()
+        except OSError:
+            return None
+        return str(template_file_path), stat.st_mtime_ns, stat.st_size
+
+    def make_key(
+        self,
+        task_name: str,
+        template_file_path,
+        extension: str,
+        task_kwargs: dict,
+        data_version: Any,
+    ) -> Optional[str]:
+        template_version = self.get_template_version(template_file_path)
+        if template_version is None or data_version is None:
+            return None
+        try:
+            content = json.dumps(
+                [
+                    task_name,
+                    template_version,
+                    extension,
+                    task_kwargs,
+                    data_version,
+                ],
+                sort_keys=True,
+                cls=DjangoJSONEncoder,
+            )
+        except (TypeError, ValueError):
+            return None
+        digest = hashlib.sha256(content.encode()).hexdigest()
+        return f"{self.prefix}:{digest}"
+
+    def get(self, key: str) -> Optional[str]:
+        """Id of a successful task whose file still exists"""
+        task_id = self.__cache.get(key)
+        if task_id is None:
+            return None
+        result = AsyncResult(task_id)
+        if not result.ready():
+            return None
+        if not result.successful() or not OutputStore().exists(result.result):
+            self.__cache.delete(key)
+            return None
+        return task_id
+
+    def set(self, key: str, task_id: str) -> None:
+        self.__cache.set(key, str(task_id), self.__timeout)
+
+
+class SingleFlight:
+    """Ids of the tasks in flight addressed by the task and its arguments,
+    identical requests attach to the running task instead of starting a new
+    one. The key is added atomically (SET NX on Redis)"""
+
+    prefix = "file_downloader:flight"
+
+    def __init__(
+        self, alias: str = "default", timeout: Optional[int] = None
+    ) -> None:
+        self.__cache = caches[alias]
+        if timeout is None:
+            timeout = settings.FILE_DOWNLOADER_SINGLE_FLIGHT_TIMEOUT
+        self.__timeout = timeout
+
+    def make_key(
+        self,
+        task_name: str,
+        template_file_path,
+        extension: str,
+        task_kwargs: dict,
+    ) -> Optional[str]:
+        try:
+            content = json.dumps(
+                [task_name, str(template_file_path), extension, task_kwargs],
+                sort_keys=True,
+                cls=DjangoJSONEncoder,
+            )
+        except (TypeError, ValueError):
+            return None
+        digest = hashlib.sha256(content.encode()).hexdigest()
+        return f"{self.prefix}:{digest}"
+
+    def claim(self, key: str, task_id: str) -> Optional[str]:
+        """None if the key is claimed by the task, otherwise the id of the
+        identical task in flight"""
+        for _ in range(2):
+            if self.__cache.add(key, task_id, self.__timeout):
+                return None
+            in_flight = self.__cache.get(key)
+            if in_flight is None:
+                continue
+            if not AsyncResult(in_flight).ready():
+                return in_flight
+            self.__cache.delete(key)
+        return None
+
+    def release(self, key: str, task_id: str) -> None:
+        if self.__cache.get(key) == task_id:
+            self.__cache.delete(key)
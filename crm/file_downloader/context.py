@@ -0,0 +1,45 @@
+from typing import Any, Iterable
+
+from django.db.models import Model, QuerySet
+from django.db.models.constants import LOOKUP_SEP
+
+
+def select_fields(queryset: QuerySet, fields: Iterable[str]) -> QuerySet:
+    """Queryset loading the fields and their relations in one query"""
+    fields = tuple(fields)
+    related = []
+    for field in fields:
+        opts = queryset.model._meta
+        path = []
+        for name in field.split(LOOKUP_SEP):
+            model_field = opts.get_field(name)
+            if not model_field.is_relation:
+                break
+            path.append(name)
+            relation = LOOKUP_SEP.join(path)
+            if relation not in related:
+                related.append(relation)
+            opts = model_field.related_model._meta
+    queryset = queryset.select_related(None)
+    if related:
+        queryset = queryset.select_related(*related)
+    return queryset.only(*fields)
+
+
+def to_dict(obj: Any, fields: Iterable[str]) -> dict:
+    """Plain dict with the fields of the object, related objects are
+    nested dicts, None or their string if named by the field itself"""
+    data = {}
+    for field in fields:
+        *relations, name = field.split(LOOKUP_SEP)
+        value, target = obj, data
+        for relation in relations:
+            value = getattr(value, relation)
+            if value is None:
+                target[relation] = None
+                break
+            target = target.setdefault(relation, {})
+        else:
+            value = getattr(value, name)
+            target[name] = str(value) if isinstance(value, Model) else value
+    return data
@@ -0,0 +1,83 @@
+import json
+import time
+from typing import Iterator, Optional
+
+from celery import states
+from celery.result import AsyncResult
+
+# Custom state of a task reporting its progress
+PROGRESS = "PROGRESS"
+
+
+def make_progress(
+    phase: str, current: int = 0, total: Optional[int] = None
+) -> dict:
+    """Metadata of the PROGRESS state"""
+    percent = None
+    if total:
+        percent = min(100, current * 100 // total)
+    return {
+        "phase": phase,
+        "current": current,
+        "total": total,
+        "percent": percent,
+    }
+
+
+def get_task_status(meta: dict) -> dict:
+    data = {"task_status": meta["status"]}
+    if meta["status"] == PROGRESS and isinstance(meta.get("result"), dict):
+        data["progress"] = meta["result"]
+    return data
+
+
+def iter_task_meta(
+    task_id: str, timeout: float, keepalive: float
+) -> Iterator[Optional[dict]]:
+    """Metadata of the task on every change of the state until the task is
+    ready or the timeout expires, None every keepalive seconds without
+    changes.
+
+    The Redis result backend publishes every stored state to the channel
+    named by the key of the task, other backends are polled."""
+    backend = AsyncResult(task_id).backend
+    client = getattr(backend, "client", None)
+    pubsub = None
+    if client is not None and hasattr(backend, "get_key_for_task"):
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+    last_event = time.monotonic()
+    deadline = last_event + timeout
+    try:
+        if pubsub is not None:
+            # Subscribing before reading the state so no change is missed
+            pubsub.subscribe(backend.get_key_for_task(task_id))
+        meta = backend.get_task_meta(task_id)
+        yield meta
+        while meta["status"] not in states.READY_STATES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if pubsub is None:
+                time.sleep(min(1, remaining))
+                changed = backend.get_task_meta(task_id)
+            else:
+                message = pubsub.get_message(timeout=min(keepalive, remaining))
+                changed = message and backend.decode_result(message["data"])
+            if changed and changed != meta:
+                meta = changed
+                last_event = time.monotonic()
+                yield meta
+            elif time.monotonic() - last_event >= keepalive:
+                last_event = time.monotonic()
+                yield None
+    finally:
+        if pubsub is not None:
+            pubsub.close()
+
+
+def format_event(data: Optional[dict]) -> str:
+    """Server-sent event with the data, a comment keeping the connection
+    alive if there is no data"""
+    if data is None:
+        return ": keepalive\n\n"
+    return f"data: {json.dumps(data)}\n\n"
@@ -0,0 +1,66 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger("django.console")
+
+
+class InlinePool:
+    """Bounded pool of threads rendering small files in the web process,
+    a job is rejected instead of queued when every thread is busy"""
+
+    def __init__(self, max_workers: int, timeout: float) -> None:
+        if max_workers < 1:
+            raise ValueError("max_workers must be a positive integer")
+        self.__executor = ThreadPoolExecutor(
+            max_workers, thread_name_prefix="file_downloader"
+        )
+        self.__slots = threading.BoundedSemaphore(max_workers)
+        self.__timeout = timeout
+
+    @property
+    def timeout(self) -> float:
+        return self.__timeout
+
+    @staticmethod
+    def __call(func: Callable, *args, **kwargs) -> Any:
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    def submit(self, func: Callable, *args, **kwargs) -> Optional[Future]:
+        """Future of the function, None if the pool is busy"""
+        if not self.__slots.acquire(blocking=False):
+            logger.info(f"{__name__} pool is busy")
+            return None
+        try:
+            future = self.__executor.submit(self.__call, func, *args, **kwargs)
+        except RuntimeError:
+            self.__slots.release()
+            raise
+        future.add_done_callback(lambda _: self.__slots.release())
+        return future
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_inline_pool() -> Optional[InlinePool]:
+    """Pool of the process, None if inline rendering is disabled"""
+    global _pool
+    if settings.FILE_DOWNLOADER_INLINE_WORKERS < 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = InlinePool(
+                settings.FILE_DOWNLOADER_INLINE_WORKERS,
+                settings.FILE_DOWNLOADER_INLINE_TIMEOUT,
+            )
+    return _pool
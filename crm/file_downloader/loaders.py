@@ -0,0 +1,73 @@
+import copy
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional
+
+import docx
+import openpyxl
+
+
+class TemplateCache:
+    """Parsed templates of the worker process addressed by the path and
+    the modification time of the file, every call returns a copy or the
+    shared template itself when make_copy is None"""
+
+    def __init__(
+        self,
+        load: Callable[[str], Any],
+        make_copy: Optional[Callable[[Any], Any]] = copy.deepcopy,
+        maxsize: int = 32,
+    ) -> None:
+        if maxsize < 1:
+            raise ValueError("maxsize must be a positive integer")
+        self.__load = load
+        self.__make_copy = make_copy
+        self.__maxsize = maxsize
+        self.__templates = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self, template_file_path) -> Any:
+        template = self.__get_template(str(template_file_path))
+        if self.__make_copy is None:
+            return template
+        return self.__make_copy(template)
+
+    def __get_template(self, path: str) -> Any:
+        stat = Path(path).stat()
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self.__lock:
+            cached = self.__templates.get(path)
+            if cached is not None and cached[0] == version:
+                self.__templates.move_to_end(path)
+                return cached[1]
+        template = self.__load(path)
+        with self.__lock:
+            self.__templates[path] = (version, template)
+            self.__templates.move_to_end(path)
+            while len(self.__templates) > self.__maxsize:
+                self.__templates.popitem(last=False)
+        return template
+
+    def warm(self, template_file_paths: Iterable) -> None:
+        for template_file_path in template_file_paths:
+            self.__get_template(str(template_file_path))
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__templates.clear()
+
+    def __len__(self) -> int:
+        return len(self.__templates)
+
+
+docx_templates = TemplateCache(docx.Document)
+# Workbooks lose their cell styles on deepcopy, so the parsed workbook is
+# shared and must only be read
+xlsx_templates = TemplateCache(openpyxl.load_workbook, make_copy=None)
+
+
+def warm_templates(directory) -> None:
+    directory = Path(directory)
+    docx_templates.warm(sorted(directory.glob("*.docx")))
+    xlsx_templates.warm(sorted(directory.glob("*.xlsx")))
@@ -0,0 +1,50 @@
+from typing import Iterable
+
+from docx.document import Document
+from docx.oxml.ns import qn
+from docxcompose.composer import Composer
+from lxml import etree
+
+
+def split_sections(
+    sections: dict, parts: int, min_rows: int = 1
+) -> list[dict]:
+    """Consecutive groups of the sections (lists of rows by their headings)
+    with close numbers of rows, at most parts groups of at least min_rows
+    rows each"""
+    if parts < 1 or min_rows < 1:
+        raise ValueError("parts and min_rows must be positive integers")
+    total = sum(len(rows) for rows in sections.values())
+    parts = max(1, min(parts, len(sections), total // min_rows))
+    groups = [{}]
+    size = 0
+    for heading, rows in sections.items():
+        if (
+            groups[-1]
+            and len(groups) < parts
+            and size >= total * len(groups) / parts
+        ):
+            groups.append({})
+        groups[-1][heading] = rows
+        size += len(rows)
+    return groups
+
+
+def compose_docx(documents: Iterable[Document], outfile) -> None:
+    """Documents rendered from one template appended to the first one, the
+    leading elements equal to the ones of the first document (title of the
+    template) are skipped"""
+    master, *documents = documents
+    composer = Composer(master)
+    prefix = [etree.tostring(element) for element in master.element.body]
+    for document in documents:
+        body = document.element.body
+        for element, master_element in zip(list(body), prefix):
+            if (
+                element.tag == qn("w:sectPr")
+                or etree.tostring(element) != master_element
+            ):
+                break
+            body.remove(element)
+        composer.append(document)
+    composer.save(outfile.name)
@@ -1,21 +1,136 @@
+import copy
+import csv
+import zipfile
+from collections.abc import Sized
+from io import BytesIO
+
 import openpyxl
 from docxtpl import DocxTemplate
+from openpyxl.cell import WriteOnlyCell
+
+from .loaders import docx_templates, xlsx_templates
+
+
+def _no_progress(phase, current=0, total=None):
+    pass
+
+
+def _iter_rows(context, progress):
+    """Rows of tbl_contents reporting the number of the written ones, the
+    total is taken from tbl_total for iterators"""
+    rows = context["tbl_contents"]
+    if isinstance(rows, Sized):
+        total = len(rows)
+    else:
+        total = context.get("tbl_total")
+    progress("render", 0, total)
+    for current, row in enumerate(rows, 1):
+        yield row
+        progress("render", current, total)
 
 
-def render_docx(template_file_path, context, outfile):
+def render_docx(template_file_path, context, outfile, progress=None):
+    progress = progress or _no_progress
+    progress("render")
     doc = DocxTemplate(template_file_path)
+    doc.docx = docx_templates.get(template_file_path)
     doc.render(context)
+    progress("save")
     doc.save(outfile.name)
 
 
-def render_xlsx(template_file_path, context, outfile):
+def render_xlsx(template_file_path, context, outfile, progress=None):
+    progress = progress or _no_progress
+    # Rows are appended to the workbook, so the shared cached one is not used
     wb = openpyxl.load_workbook(template_file_path)
     ws = wb.active
-    for row in context["tbl_contents"]:
+    for row in _iter_rows(context, progress):
+        ws.append(row)
+    progress("save")
+    wb.save(outfile.name)
+
+
+def _copy_header(template_sheet, sheet):
+    """Rows, merged cells and dimensions of the template sheet"""
+    # Dimensions keep style ids of the template workbook, so only the sizes
+    # are copied
+    for key, dimension in template_sheet.column_dimensions.items():
+        sheet.column_dimensions[key].width = dimension.width
+        sheet.column_dimensions[key].hidden = dimension.hidden
+    for key, dimension in template_sheet.row_dimensions.items():
+        sheet.row_dimensions[key].height = dimension.height
+    for cell_range in template_sheet.merged_cells.ranges:
+        sheet.merged_cells.add(copy.copy(cell_range))
+    sheet.freeze_panes = template_sheet.freeze_panes
+    for row in template_sheet.iter_rows():
+        cells = []
+        for template_cell in row:
+            cell = WriteOnlyCell(sheet, template_cell.value)
+            if template_cell.has_style:
+                cell.font = copy.copy(template_cell.font)
+                cell.fill = copy.copy(template_cell.fill)
+                cell.border = copy.copy(template_cell.border)
+                cell.alignment = copy.copy(template_cell.alignment)
+                cell.number_format = template_cell.number_format
+                cell.protection = copy.copy(template_cell.protection)
+            cells.append(cell)
+        sheet.append(cells)
+
+
+def render_xlsx_stream(template_file_path, context, outfile, progress=None):
+    """Write-only workbook with the header of the template, rows of
+    tbl_contents are consumed one by one and written to the file"""
+    progress = progress or _no_progress
+    # Only the header is read, so the cached workbook is used without a copy
+    # or another parse of the template
+    template_sheet = xlsx_templates.get(template_file_path).active
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(template_sheet.title)
+    _copy_header(template_sheet, ws)
+    for row in _iter_rows(context, progress):
         ws.append(row)
+    progress("save")
     wb.save(outfile.name)
 
 
+# Byte order mark lets Excel detect the encoding of csv files
+CSV_ENCODING = "utf-8-sig"
+
+
+def read_csv_header(template_file_path):
+    """Rows of the csv template written before the rows of the table"""
+    with open(template_file_path, newline="", encoding=CSV_ENCODING) as file:
+        return list(csv.reader(file))
+
+
+def render_csv(template_file_path, context, outfile, progress=None):
+    """Csv with the header of the template, rows of tbl_contents are
+    consumed one by one and written to the file"""
+    progress = progress or _no_progress
+    with open(outfile.name, "w", newline="", encoding=CSV_ENCODING) as file:
+        writer = csv.writer(file)
+        writer.writerows(read_csv_header(template_file_path))
+        for row in _iter_rows(context, progress):
+            writer.writerow(row)
+        progress("save")
+
+
+def render_docx_zip(template_file_path, context, outfile, progress=None):
+    """Zip archive of the documents rendered from one parsed template,
+    tbl_contents holds pairs of the name of the document and its context"""
+    progress = progress or _no_progress
+    # Documents are compressed already
+    with zipfile.ZipFile(outfile.name, "w", zipfile.ZIP_STORED) as archive:
+        for name, document_context in _iter_rows(context, progress):
+            doc = DocxTemplate(template_file_path)
+            doc.docx = docx_templates.get(template_file_path)
+            doc.render(document_context)
+            content = BytesIO()
+            doc.save(content)
+            archive.writestr(name, content.getvalue())
+        progress("save")
+
+
 renders_list = {
     "docx": render_docx,
     "xlsx": render_xlsx,
@@ -23,8 +138,16 @@ renders_list = {
 
 
 def register_render(name, render):
-    if name is not str:
+    """Renders are called with the path of the template, the context, the
+    output file and the progress keyword argument - a callable taking the
+    phase, the number of written rows and the total"""
+    if not isinstance(name, str):
         raise ValueError("Name of render function must be a str")
     if not callable(render):
         raise ValueError("Render must be a callable object")
     renders_list[name] = render
+
+
+register_render("xlsx_stream", render_xlsx_stream)
+register_render("docx_zip", render_docx_zip)
+register_render("csv", render_csv)
@@ -0,0 +1,184 @@
+import logging
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import File
+from django.core.files.storage import Storage, storages
+from django.core.files.temp import NamedTemporaryFile
+
+logger = logging.getLogger("django.console")
+
+
+class OutputStore:
+    """Generated files kept in a Django storage with a time to live and a
+    size quota, files are addressed by their storage keys"""
+
+    metrics_prefix = "file_downloader:store"
+    metrics = (
+        "stored_bytes",
+        "stored_files",
+        "evicted_bytes",
+        "evicted_files",
+        "downloaded_files",
+    )
+
+    def __init__(
+        self,
+        storage: Optional[Storage] = None,
+        ttl: Optional[int] = None,
+        quota: Optional[int] = None,
+        cache_alias: str = "default",
+    ) -> None:
+        if storage is None:
+            storage = storages[settings.FILE_DOWNLOADER_STORAGE]
+        self.__storage = storage
+        self.__ttl = (
+            settings.FILE_DOWNLOADER_OUTPUT_TTL if ttl is None else ttl
+        )
+        self.__quota = (
+            settings.FILE_DOWNLOADER_OUTPUT_QUOTA if quota is None else quota
+        )
+        self.__cache = caches[cache_alias]
+
+    @property
+    def storage(self) -> Storage:
+        return self.__storage
+
+    @property
+    def ttl(self) -> int:
+        return self.__ttl
+
+    @property
+    def quota(self) -> int:
+        return self.__quota
+
+    def save(self, content, extension: str) -> str:
+        """Key of the file saved from the file-like object"""
+        name = self.__new_name(extension)
+        key = self.__storage.save(name, File(content, name))
+        self.__add_stored(self.__storage.size(key))
+        return key
+
+    def write(self, extension: str, write: Callable[..., None]) -> str:
+        """Key of the file written by write(outfile) to the named file, in
+        place for local storages and through a temporary file otherwise"""
+        name = self.__new_name(extension)
+        path = self.path(name)
+        if path is None:
+            with NamedTemporaryFile(suffix=f".{extension}") as outfile:
+                write(outfile)
+                with open(outfile.name, "rb") as content:
+                    return self.save(content, extension)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            with open(path, "xb") as outfile:
+                write(outfile)
+        except BaseException:
+            path.unlink(missing_ok=True)
+            raise
+        self.__add_stored(path.stat().st_size)
+        return name
+
+    def open(self, key: str) -> File:
+        return self.__storage.open(key, "rb")
+
+    def exists(self, key) -> bool:
+        if not key or not isinstance(key, str):
+            return False
+        try:
+            return self.__storage.exists(key)
+        except SuspiciousFileOperation:
+            return False
+
+    def path(self, key: str) -> Optional[Path]:
+        """Local path of the file, None for remote storages"""
+        try:
+            return Path(self.__storage.path(key))
+        except NotImplementedError:
+            return None
+
+    def delete(self, key, downloaded: bool = False) -> bool:
+        if not self.exists(key):
+            return False
+        size = self.__storage.size(key)
+        self.__storage.delete(key)
+        self.__incr("stored_files", -1)
+        self.__incr("stored_bytes", -size)
+        if downloaded:
+            self.__incr("downloaded_files")
+        return True
+
+    def __get_files(self) -> list[tuple[float, int, str]]:
+        files = []
+        try:
+            _, names = self.__storage.listdir("")
+        except FileNotFoundError:
+            return files
+        for name in names:
+            try:
+                mtime = self.__storage.get_modified_time(name).timestamp()
+                size = self.__storage.size(name)
+            except FileNotFoundError:
+                continue
+            files.append((mtime, size, name))
+        return sorted(files)
+
+    def reap(self, now: Optional[float] = None) -> dict:
+        """Remove expired files, then the oldest ones over the quota, the
+        stored metrics kept by save and delete are recounted"""
+        now = time.time() if now is None else now
+        files = self.__get_files()
+        stored = sum(size for _, size, _ in files)
+        evicted_files = evicted_bytes = 0
+        for mtime, size, name in files:
+            if now - mtime < self.__ttl and stored <= self.__quota:
+                break
+            self.__storage.delete(name)
+            evicted_files += 1
+            evicted_bytes += size
+            stored -= size
+        if evicted_files:
+            logger.info(
+                f"{__name__} evicted {evicted_files} files, "
+                f"{evicted_bytes} bytes"
+            )
+            self.__incr("evicted_files", evicted_files)
+            self.__incr("evicted_bytes", evicted_bytes)
+        self.__cache.set_many(
+            {
+                self.__metric_key("stored_bytes"): stored,
+                self.__metric_key("stored_files"): len(files) - evicted_files,
+            },
+            None,
+        )
+        return {
+            "evicted_files": evicted_files,
+            "evicted_bytes": evicted_bytes,
+            "stored_bytes": stored,
+        }
+
+    def get_metrics(self) -> dict:
+        keys = {self.__metric_key(name): name for name in self.metrics}
+        values = self.__cache.get_many(keys)
+        return {name: values.get(key, 0) for key, name in keys.items()}
+
+    @staticmethod
+    def __new_name(extension: str) -> str:
+        return f"{uuid.uuid4().hex}.{extension}"
+
+    def __add_stored(self, size: int) -> None:
+        self.__incr("stored_files")
+        self.__incr("stored_bytes", size)
+
+    def __metric_key(self, name: str) -> str:
+        return f"{self.metrics_prefix}:{name}"
+
+    def __incr(self, name: str, delta: int = 1) -> None:
+        key = self.__metric_key(name)
+        self.__cache.add(key, 0, None)
+        self.__cache.incr(key, delta)
@@ -1,13 +1,47 @@
+import time
+import zipfile
+from pathlib import Path
+
 import celery
+import docx
+from celery.exceptions import Ignore
+from celery.signals import worker_process_init
+from django.conf import settings
+from django.core.cache import cache
 from django.core.files.temp import NamedTemporaryFile
 
-from .renders import renders_list
+from .events import PROGRESS, make_progress
+from .loaders import warm_templates
+from .parts import compose_docx, split_sections
+from .renders import render_docx, renders_list
+from .storage import OutputStore
+
+
+def render_to_store(
+    render, template_file_path, context, extension, progress=None
+):
+    """Storage key of the rendered file, rendered straight into local
+    storages and through a local file of the worker into remote ones, so
+    the web and the worker processes may run on different hosts"""
+
+    def write(outfile):
+        render(template_file_path, context, outfile, progress=progress)
+        if progress:
+            progress("store")
+
+    return OutputStore().write(extension, write)
 
 
 class BuildFileTask(celery.Task):
     temp_file_extension = ""
     template_file_path = ""
+    # Name of the render in renders_list, the extension of the file if empty
+    render_name = ""
     broker_connection_retry = True
+    # Minimal number of seconds between progress updates of one phase
+    progress_interval = 0.5
+    __progress_phase = None
+    __progress_time = 0
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -17,23 +51,54 @@ class BuildFileTask(celery.Task):
             "Can't use 'get_file_context' on an BuildFileTask"
         )
 
-    def build(self):
-        outfile = NamedTemporaryFile(
-            suffix=f".{self.temp_file_extension}", delete=False
+    def get_data_version(self, **kwargs):
+        """Cheap version of the data in the file for the task kwargs,
+        None disables reusing of built files"""
+        return None
+
+    def report_progress(self, phase, current=0, total=None):
+        """Throttled PROGRESS state with the phase (query, render, save,
+        store) and the number of written rows"""
+        if self.request_stack is None or self.request.id is None:
+            return
+        now = time.monotonic()
+        if (
+            phase == self.__progress_phase
+            and now - self.__progress_time < self.progress_interval
+        ):
+            return
+        self.__progress_phase = phase
+        self.__progress_time = now
+        self.update_state(
+            state=PROGRESS, meta=make_progress(phase, current, total)
         )
 
-        if self.temp_file_extension not in renders_list:
-            raise ValueError(
-                f"Unknown type of file - {self.temp_file_extension}"
-            )
+    def build(self):
+        """Storage key of the built file"""
+        render_name = self.render_name or self.temp_file_extension
+        if render_name not in renders_list:
+            raise ValueError(f"Unknown type of file - {render_name}")
 
-        render = renders_list.get(self.temp_file_extension)
+        render = renders_list.get(render_name)
 
         if not render or not callable(render):
             raise ValueError(f"Render must be a callable - {type(render)}")
 
-        render(self.template_file_path, self.get_file_context(), outfile)
-        return outfile.name
+        self.report_progress("query")
+        context = self.get_file_context()
+        return render_to_store(
+            render,
+            self.template_file_path,
+            context,
+            self.temp_file_extension,
+            self.report_progress,
+        )
+
+    def build_inline(self, template_file_path, temp_file_extension, **kwargs):
+        """Key of the file built in the calling process by a new instance,
+        the registered one is shared between threads"""
+        task = type(self)()
+        return task.run(template_file_path, temp_file_extension, **kwargs)
 
     def run(self, template_file_path, temp_file_extension="docx", **kwargs):
         if kwargs:
@@ -41,7 +106,137 @@ class BuildFileTask(celery.Task):
                 setattr(self, key, value)
         self.template_file_path = template_file_path
         self.temp_file_extension = temp_file_extension
+        self.__progress_phase = None
+        self.__progress_time = 0
         try:
             return self.build()
+        except Ignore:
+            # The task is replaced by the tasks building the file
+            raise
         except Exception as exc:
             self.retry(exc=exc, countdown=5)
+
+
+class BuildDocxPartsFileTask(BuildFileTask):
+    """Docx with the sections of tbl_contents (lists of rows by their
+    headings) rendered by parallel tasks and merged, the task is replaced
+    by the chord keeping its id. Small documents are rendered at once."""
+
+    def build(self):
+        self.report_progress("query")
+        context = self.get_file_context()
+        groups = split_sections(
+            context["tbl_contents"],
+            settings.FILE_DOWNLOADER_DOCX_PARTS,
+            settings.FILE_DOWNLOADER_DOCX_PART_ROWS,
+        )
+        if (
+            len(groups) < 2
+            or self.request_stack is None
+            or self.request.id is None
+        ):
+            return render_to_store(
+                render_docx,
+                self.template_file_path,
+                context,
+                "docx",
+                self.report_progress,
+            )
+        self.report_progress("render", 0, len(groups))
+        parts = celery.group(
+            render_docx_part.s(
+                str(self.template_file_path),
+                {**context, "tbl_contents": group},
+                progress_id=self.request.id,
+                parts=len(groups),
+            )
+            for group in groups
+        )
+        return self.replace(celery.chord(parts, merge_docx_parts.s()))
+
+
+class BuildBundleFileTask(BuildFileTask):
+    """Zip archive of one context rendered to several formats, the context
+    is read once and must be iterable many times. The template of a format
+    is the template of the task with the extension of the format."""
+
+    # Names of the renders in renders_list by the extensions of the formats
+    bundle_renders = {}
+    # Extensions of the formats in the archive, all of them if empty
+    formats = ()
+
+    def get_formats(self):
+        formats = tuple(self.formats) or tuple(self.bundle_renders)
+        for extension in formats:
+            if self.bundle_renders.get(extension) not in renders_list:
+                raise ValueError(f"Unknown format of file - {extension}")
+        return formats
+
+    def render_bundle(self, template_file_path, context, outfile, progress):
+        template_file_path = Path(template_file_path)
+        with zipfile.ZipFile(
+            outfile.name, "w", zipfile.ZIP_DEFLATED
+        ) as archive:
+            for extension in self.get_formats():
+                render = renders_list[self.bundle_renders[extension]]
+                template = template_file_path.with_suffix(f".{extension}")
+                with NamedTemporaryFile(suffix=f".{extension}") as part:
+                    render(template, context, part, progress=progress)
+                    archive.write(part.name, template.name)
+
+    def build(self):
+        self.get_formats()
+        self.report_progress("query")
+        context = self.get_file_context()
+        return render_to_store(
+            self.render_bundle,
+            self.template_file_path,
+            context,
+            "zip",
+            self.report_progress,
+        )
+
+
+@celery.shared_task(name="file_downloader.render_docx_part", bind=True)
+def render_docx_part(
+    self, template_file_path, context, progress_id=None, parts=None
+):
+    """Storage key of the rendered part, the number of rendered parts is
+    reported as the progress of the task progress_id"""
+    key = render_to_store(render_docx, template_file_path, context, "docx")
+    if progress_id:
+        counter = f"file_downloader:parts:{progress_id}"
+        cache.add(counter, 0, settings.FILE_DOWNLOADER_OUTPUT_TTL)
+        self.backend.store_result(
+            progress_id,
+            make_progress("render", cache.incr(counter), parts),
+            PROGRESS,
+        )
+    return key
+
+
+@celery.shared_task(name="file_downloader.merge_docx_parts")
+def merge_docx_parts(keys):
+    """Storage key of the document merged from the parts, the parts are
+    removed"""
+    output_store = OutputStore()
+    documents = []
+    for key in keys:
+        with output_store.open(key) as content:
+            documents.append(docx.Document(content))
+    merged = output_store.write(
+        "docx", lambda outfile: compose_docx(documents, outfile)
+    )
+    for key in keys:
+        output_store.delete(key)
+    return merged
+
+
+@celery.shared_task(name="file_downloader.reap_output_store")
+def reap_output_store():
+    return OutputStore().reap()
+
+
+@worker_process_init.connect
+def warm_worker_templates(**kwargs):
+    warm_templates(settings.FILE_DOWNLOADER_TEMPLATES_DIR)
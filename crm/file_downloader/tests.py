@@ -1,10 +1,70 @@
+import codecs
+import json
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from io import BytesIO
 from pathlib import Path
-from unittest.mock import Mock
+from unittest.mock import Mock, PropertyMock, call, patch
 
-from django.test import TestCase
+import docx
+import openpyxl
+from celery.backends.cache import CacheBackend
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.http import Http404
+from django.test import RequestFactory, TestCase, override_settings
+from docxtpl import DocxTemplate
 from parameterized import parameterized
 
-from file_downloader.views import CreateFileView, DownloadFileView
+from crm import celery_app
+from file_downloader.cache import ReportCache, SingleFlight
+from file_downloader.events import iter_task_meta, make_progress
+from file_downloader.inline import InlinePool, get_inline_pool
+from file_downloader.loaders import TemplateCache
+from file_downloader.parts import compose_docx, split_sections
+from file_downloader.renders import (
+    register_render,
+    render_csv,
+    render_docx,
+    render_docx_zip,
+    render_xlsx,
+    render_xlsx_stream,
+    renders_list,
+)
+from file_downloader.storage import OutputStore
+from file_downloader.tasks import (
+    BuildBundleFileTask,
+    BuildDocxPartsFileTask,
+    BuildFileTask,
+    reap_output_store,
+)
+from file_downloader.views import (
+    CreateFileDocxView,
+    CreateFileView,
+    DownloadFileDocxView,
+    DownloadFileView,
+    StreamingCsvView,
+    TaskEventsView,
+    TaskStatusView,
+)
+
+
+def override_output_storage(location):
+    """Хранилище сгенерированных файлов во временном каталоге"""
+    return override_settings(
+        STORAGES={
+            "default": {
+                "BACKEND": "django.core.files.storage.FileSystemStorage",
+            },
+            "file_downloader": {
+                "BACKEND": "django.core.files.storage.FileSystemStorage",
+                "OPTIONS": {"location": location},
+            },
+        }
+    )
 
 
 class CreateFileViewTests(TestCase):
@@ -90,3 +150,1325 @@ class DownloadFileViewTests(TestCase):
                 extension=extension,
                 content_type=content_type,
             )
+
+
+class DownloadFileResponseTests(TestCase):
+    """Тесты отдачи сгенерированного файла"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = Path(self.directory.name)
+        self.path = self.root / "отчёт 1.docx"
+        self.path.write_bytes(b"content" * 1000)
+        self.request = RequestFactory().get("/download/")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _get(self, key, **initkwargs):
+        view = DownloadFileDocxView.as_view(filename="list", **initkwargs)
+        with override_output_storage(self.root), patch.object(
+            DownloadFileDocxView, "get_file_key", return_value=key
+        ):
+            return view(self.request, task_id="task")
+
+    @parameterized.expand([(None,), ("",)])
+    def test_file_response_ok(self, accel_redirect_url):
+        """Тест потоковой отдачи файла без nginx"""
+        with override_settings(
+            FILE_DOWNLOADER_ROOT=self.root,
+            FILE_DOWNLOADER_ACCEL_REDIRECT_URL="",
+        ):
+            response = self._get(
+                self.path.name, accel_redirect_url=accel_redirect_url
+            )
+        self.assertTrue(response.streaming)
+        self.assertNotIn("X-Accel-Redirect", response)
+        self.assertEqual(
+            response["Content-Disposition"], 'attachment; filename="list.docx"'
+        )
+        self.assertEqual(
+            response["Content-Length"], str(self.path.stat().st_size)
+        )
+        self.assertEqual(
+            b"".join(response.streaming_content), self.path.read_bytes()
+        )
+        response.close()
+
+    def test_accel_redirect_ok(self):
+        """Тест передачи отдачи файла nginx"""
+        with override_settings(
+            FILE_DOWNLOADER_ROOT=self.root,
+            FILE_DOWNLOADER_ACCEL_REDIRECT_URL="/protected-files/",
+        ):
+            response = self._get(self.path.name)
+        self.assertFalse(response.streaming)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(
+            response["X-Accel-Redirect"],
+            "/protected-files/%D0%BE%D1%82%D1%87%D1%91%D1%82%201.docx",
+        )
+        self.assertEqual(
+            response["Content-Disposition"], 'attachment; filename="list.docx"'
+        )
+        self.assertEqual(
+            response["Content-Type"], DownloadFileDocxView.content_type
+        )
+
+    def test_accel_redirect_outside_root(self):
+        """Тест отдачи файла вне каталога nginx"""
+        with override_settings(
+            FILE_DOWNLOADER_ROOT=self.root / "other",
+            FILE_DOWNLOADER_ACCEL_REDIRECT_URL="/protected-files/",
+        ):
+            response = self._get(self.path.name)
+        self.assertTrue(response.streaming)
+        self.assertNotIn("X-Accel-Redirect", response)
+        response.close()
+
+    @parameterized.expand([(None,), ("",), ("other.docx",), ("../x.docx",)])
+    def test_file_not_found(self, key):
+        """Тест отсутствия файла в хранилище"""
+        with self.assertRaises(Http404):
+            self._get(key)
+
+    def test_remote_storage_ok(self):
+        """Тест потоковой отдачи файла из хранилища без локальных путей"""
+        with override_settings(
+            FILE_DOWNLOADER_ROOT=self.root,
+            FILE_DOWNLOADER_ACCEL_REDIRECT_URL="/protected-files/",
+        ), patch.object(OutputStore, "path", return_value=None):
+            response = self._get(self.path.name)
+        self.assertTrue(response.streaming)
+        self.assertNotIn("X-Accel-Redirect", response)
+        self.assertEqual(
+            b"".join(response.streaming_content), self.path.read_bytes()
+        )
+        response.close()
+
+
+class ReportCacheTests(TestCase):
+    """Тесты кэша сгенерированных отчётов"""
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.TemporaryDirectory()
+        self.template = Path(self.directory.name) / "template.docx"
+        self.template.write_bytes(b"template")
+        self.report = Path(self.directory.name) / "report.docx"
+        self.report.write_bytes(b"report")
+        storage = override_output_storage(self.directory.name)
+        storage.enable()
+        self.addCleanup(storage.disable)
+        self.report_cache = ReportCache()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _make_key(self, data_version=1, **task_kwargs):
+        return self.report_cache.make_key(
+            "task", self.template, "docx", task_kwargs, data_version
+        )
+
+    def test_make_key_ok(self):
+        """Тест построения ключа по шаблону, параметрам и версии данных"""
+        key = self._make_key(order="surname")
+        self.assertEqual(key, self._make_key(order="surname"))
+        self.assertNotEqual(key, self._make_key(order="entry_date"))
+        self.assertNotEqual(key, self._make_key(2, order="surname"))
+
+        stat = self.template.stat()
+        os.utime(self.template, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        self.assertNotEqual(key, self._make_key(order="surname"))
+
+    @parameterized.expand([(None,), (Mock(),)])
+    def test_make_key_none(self, data_version):
+        """Тест отключения кэша без версии данных"""
+        self.assertIsNone(self._make_key(data_version))
+        self.assertIsNone(
+            self.report_cache.make_key(
+                "task", Path("/not/exists"), "docx", {}, 1
+            )
+        )
+
+    @parameterized.expand(
+        [
+            (True, True, True, "task_id"),
+            (False, False, True, None),
+            (True, False, False, None),
+        ]
+    )
+    def test_get_ok(self, ready, successful, kept, expected):
+        """Тест получения готового отчёта из кэша"""
+        key = self._make_key()
+        self.report_cache.set(key, "task_id")
+        result = Mock(result=self.report.name)
+        result.ready.return_value = ready
+        result.successful.return_value = successful
+        with patch("file_downloader.cache.AsyncResult", return_value=result):
+            self.assertEqual(self.report_cache.get(key), expected)
+        self.assertEqual(cache.get(key) is not None, kept)
+
+    def test_get_file_removed(self):
+        """Тест получения из кэша отчёта с удалённым файлом"""
+        key = self._make_key()
+        self.report_cache.set(key, "task_id")
+        self.report.unlink()
+        result = Mock(result=self.report.name)
+        with patch("file_downloader.cache.AsyncResult", return_value=result):
+            self.assertIsNone(self.report_cache.get(key))
+        self.assertIsNone(cache.get(key))
+
+    def test_create_file_view_reuses_task(self):
+        """Тест повторного использования готового отчёта представлением"""
+        task = Mock()
+        task.name = "task"
+        task.get_data_version.return_value = {"count": 1}
+        view = type(
+            "View",
+            (CreateFileDocxView,),
+            {
+                "template_file_path": str(self.template),
+                "download_url": "hospitalizations:download_docx",
+                "task": task,
+                "task_kwargs": {"pk": 1},
+            },
+        ).as_view()
+        request = RequestFactory().get("/create/")
+
+        response = view(request)
+        task_id = response.context_data["task_id"]
+        self.assertNotIn("cached", response.context_data)
+        task.get_data_version.assert_called_once_with(pk=1)
+
+        result = Mock(result=self.report.name)
+        with patch("file_downloader.cache.AsyncResult", return_value=result):
+            response = view(request)
+        self.assertEqual(response.context_data["task_id"], task_id)
+        self.assertTrue(response.context_data["cached"])
+        task.apply_async.assert_called_once_with(
+            (str(self.template), "docx"), {"pk": 1}, task_id=task_id
+        )
+
+
+class OutputStoreTests(TestCase):
+    """Тесты хранилища сгенерированных файлов"""
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = Path(self.directory.name) / "reports"
+        self.store = OutputStore(
+            FileSystemStorage(location=self.root), ttl=60, quota=100
+        )
+        self.now = time.time()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _make_file(self, name, size, age):
+        self.root.mkdir(exist_ok=True)
+        path = self.root / name
+        path.write_bytes(b"x" * size)
+        mtime = self.now - age
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def test_save_ok(self):
+        """Тест сохранения файла в хранилище"""
+        key = self.store.save(BytesIO(b"content"), "docx")
+        self.assertTrue(key.endswith(".docx"))
+        self.assertTrue(self.store.exists(key))
+        self.assertEqual(self.store.path(key), self.root / key)
+        with self.store.open(key) as file:
+            self.assertEqual(file.read(), b"content")
+        self.assertNotEqual(key, self.store.save(BytesIO(b"content"), "docx"))
+
+    def test_write_local(self):
+        """Тест записи файла сразу в локальное хранилище"""
+        paths = []
+
+        def write(outfile):
+            paths.append(Path(outfile.name))
+            outfile.write(b"content")
+
+        key = self.store.write("docx", write)
+        self.assertEqual(paths, [self.root / key])
+        with self.store.open(key) as file:
+            self.assertEqual(file.read(), b"content")
+        self.assertEqual(self.store.get_metrics()["stored_bytes"], 7)
+
+    def test_write_remote(self):
+        """Тест записи файла в удалённое хранилище через временный файл"""
+        storage = Mock()
+        storage.path.side_effect = NotImplementedError
+        storage.save.side_effect = lambda name, content: name
+        storage.size.return_value = 7
+        key = OutputStore(storage).write(
+            "docx", lambda outfile: outfile.write(b"content")
+        )
+        storage.save.assert_called_once()
+        self.assertEqual(storage.save.call_args.args[0], key)
+
+    def test_write_error(self):
+        """Тест удаления недописанного файла"""
+
+        def write(outfile):
+            outfile.write(b"content")
+            raise ValueError
+
+        with self.assertRaises(ValueError):
+            self.store.write("docx", write)
+        self.assertEqual(list(self.root.iterdir()), [])
+        self.assertEqual(self.store.get_metrics()["stored_files"], 0)
+
+    @parameterized.expand(
+        [(None,), ("",), (1,), ("not_exists.docx",), ("../other.docx",)]
+    )
+    def test_exists_false(self, key):
+        """Тест проверки отсутствующего или недопустимого ключа"""
+        (Path(self.directory.name) / "other.docx").write_bytes(b"content")
+        self.assertFalse(self.store.exists(key))
+        self.assertFalse(self.store.delete(key))
+
+    def test_path_remote_storage(self):
+        """Тест хранилища без локальных путей"""
+        storage = Mock()
+        storage.path.side_effect = NotImplementedError
+        self.assertIsNone(OutputStore(storage).path("report.docx"))
+
+    def test_reap_expired(self):
+        """Тест удаления файлов с истёкшим временем жизни"""
+        expired = self._make_file("expired.docx", 10, 120)
+        fresh = self._make_file("fresh.docx", 20, 10)
+
+        result = self.store.reap(self.now)
+
+        self.assertFalse(expired.exists())
+        self.assertTrue(fresh.exists())
+        self.assertEqual(
+            result,
+            {"evicted_files": 1, "evicted_bytes": 10, "stored_bytes": 20},
+        )
+
+    def test_reap_quota(self):
+        """Тест удаления самых старых файлов при превышении квоты"""
+        oldest = self._make_file("1.docx", 60, 30)
+        older = self._make_file("2.docx", 30, 20)
+        newest = self._make_file("3.docx", 40, 10)
+
+        result = self.store.reap(self.now)
+
+        self.assertFalse(oldest.exists())
+        self.assertTrue(older.exists())
+        self.assertTrue(newest.exists())
+        self.assertEqual(result["stored_bytes"], 70)
+
+    def test_reap_empty(self):
+        """Тест очистки несуществующего каталога"""
+        self.assertEqual(
+            self.store.reap(self.now),
+            {"evicted_files": 0, "evicted_bytes": 0, "stored_bytes": 0},
+        )
+
+    def test_metrics_ok(self):
+        """Тест метрик хранилища"""
+        self._make_file("expired.docx", 10, 120)
+        self._make_file("fresh.docx", 20, 10)
+        self.store.reap(self.now)
+        self._make_file("expired.xlsx", 5, 120)
+        self.store.reap(self.now)
+        key = self.store.save(BytesIO(b"x"), "docx")
+        self.assertTrue(self.store.delete(key, downloaded=True))
+
+        self.assertEqual(
+            self.store.get_metrics(),
+            {
+                "stored_bytes": 20,
+                "stored_files": 1,
+                "evicted_bytes": 15,
+                "evicted_files": 2,
+                "downloaded_files": 1,
+            },
+        )
+
+    def test_metrics_save_delete(self):
+        """Тест метрик хранилища без очистки"""
+        first = self.store.save(BytesIO(b"x" * 10), "docx")
+        self.store.save(BytesIO(b"x" * 5), "xlsx")
+        self.assertEqual(self.store.get_metrics()["stored_bytes"], 15)
+        self.assertEqual(self.store.get_metrics()["stored_files"], 2)
+
+        self.store.delete(first)
+
+        self.assertEqual(self.store.get_metrics()["stored_bytes"], 5)
+        self.assertEqual(self.store.get_metrics()["stored_files"], 1)
+
+    def test_reap_task_ok(self):
+        """Тест периодической задачи очистки хранилища"""
+        expired = self._make_file("expired.docx", 10, 60 * 60 * 24)
+        with override_output_storage(self.root):
+            result = reap_output_store.apply().get()
+        self.assertFalse(expired.exists())
+        self.assertEqual(result["evicted_files"], 1)
+
+    @parameterized.expand([(True, False), (False, True)])
+    def test_delete_after_download(self, delete_after_download, exists):
+        """Тест удаления файла после скачивания"""
+        path = self._make_file("report.docx", 10, 0)
+        view = DownloadFileDocxView.as_view(
+            filename="list", delete_after_download=delete_after_download
+        )
+        with override_output_storage(self.root), override_settings(
+            FILE_DOWNLOADER_ACCEL_REDIRECT_URL="",
+        ), patch.object(
+            DownloadFileDocxView, "get_file_key", return_value=path.name
+        ):
+            response = view(RequestFactory().get("/download/"), task_id="1")
+            self.assertEqual(b"".join(response.streaming_content), b"x" * 10)
+            response.close()
+        self.assertEqual(path.exists(), exists)
+
+
+class TemplateCacheTests(TestCase):
+    """Тесты кэша шаблонов рабочего процесса"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = Path(self.directory.name)
+        self.template = self.root / "template.docx"
+        document = docx.Document()
+        document.add_paragraph("Пациент {{ name }}")
+        document.save(self.template)
+        self.load = Mock(side_effect=docx.Document)
+        self.templates = TemplateCache(self.load, maxsize=2)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_get_copy_ok(self):
+        """Тест однократного разбора шаблона и выдачи копий"""
+        first = self.templates.get(self.template)
+        first.add_paragraph("Изменение")
+        second = self.templates.get(self.template)
+
+        self.load.assert_called_once_with(str(self.template))
+        self.assertIsNot(first, second)
+        self.assertEqual(len(second.paragraphs), 1)
+
+    def test_get_shared_ok(self):
+        """Тест выдачи общего шаблона без копирования"""
+        templates = TemplateCache(self.load, make_copy=None)
+        first = templates.get(self.template)
+        second = templates.get(self.template)
+
+        self.load.assert_called_once_with(str(self.template))
+        self.assertIs(first, second)
+
+    def test_get_file_changed(self):
+        """Тест повторного разбора изменённого шаблона"""
+        self.templates.get(self.template)
+        stat = self.template.stat()
+        os.utime(self.template, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        self.templates.get(self.template)
+        self.assertEqual(self.load.call_count, 2)
+
+    def test_maxsize(self):
+        """Тест ограничения числа шаблонов в кэше"""
+        paths = []
+        for i in range(3):
+            path = self.root / f"{i}.docx"
+            docx.Document().save(path)
+            paths.append(path)
+        self.templates.warm(paths)
+        self.assertEqual(len(self.templates), 2)
+        self.templates.get(paths[0])
+        self.assertEqual(self.load.call_count, 4)
+
+    def test_maxsize_error(self):
+        """Тест создания кэша с неверным размером"""
+        with self.assertRaises(ValueError):
+            TemplateCache(docx.Document, maxsize=0)
+
+    def test_render_docx_ok(self):
+        """Тест формирования документов из кэшированного шаблона"""
+        for name in ("Иванов", "Петров"):
+            with tempfile.NamedTemporaryFile(
+                suffix=".docx", dir=self.root, delete=False
+            ) as outfile:
+                render_docx(self.template, {"name": name}, outfile)
+            self.assertEqual(
+                docx.Document(outfile.name).paragraphs[0].text,
+                f"Пациент {name}",
+            )
+
+    def test_render_xlsx_ok(self):
+        """Тест формирования таблиц из кэшированного шаблона"""
+        template = self.root / "template.xlsx"
+        workbook = openpyxl.Workbook()
+        workbook.active.append(["ФИО"])
+        workbook.save(template)
+        for rows in ([["Иванов"]], [["Петров"], ["Сидоров"]]):
+            with tempfile.NamedTemporaryFile(
+                suffix=".xlsx", dir=self.root, delete=False
+            ) as outfile:
+                render_xlsx(template, {"tbl_contents": rows}, outfile)
+            values = list(openpyxl.load_workbook(outfile.name).active.values)
+            self.assertEqual(values, [("ФИО",), *map(tuple, rows)])
+
+
+class StreamingXlsxRenderTests(TestCase):
+    """Тесты потокового формирования xlsx"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = Path(self.directory.name)
+        self.template = self.root / "template.xlsx"
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.title = "Список"
+        sheet.append(["Список больных"])
+        sheet.merge_cells("A1:B1")
+        sheet.append(["Пациент", "Врач"])
+        sheet["A2"].font = openpyxl.styles.Font(bold=True)
+        sheet.column_dimensions["A"].width = 30
+        workbook.save(self.template)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _render(self, rows):
+        with tempfile.NamedTemporaryFile(
+            suffix=".xlsx", dir=self.root, delete=False
+        ) as outfile:
+            render_xlsx_stream(self.template, {"tbl_contents": rows}, outfile)
+        return openpyxl.load_workbook(outfile.name).active
+
+    def test_render_ok(self):
+        """Тест формирования таблицы из итератора строк"""
+        rows = ((f"Пациент {i}", "Врач") for i in range(1000))
+        sheet = self._render(rows)
+
+        self.assertEqual(sheet.title, "Список")
+        self.assertEqual(sheet.max_row, 1002)
+        self.assertEqual(sheet["A3"].value, "Пациент 0")
+        self.assertEqual(sheet["A1002"].value, "Пациент 999")
+        self.assertIsNone(next(rows, None))
+
+    def test_render_header_ok(self):
+        """Тест переноса заголовка и оформления из шаблона"""
+        sheet = self._render(iter([]))
+
+        self.assertEqual(sheet["A1"].value, "Список больных")
+        self.assertEqual(sheet["B2"].value, "Врач")
+        self.assertTrue(sheet["A2"].font.bold)
+        self.assertFalse(sheet["B2"].font.bold)
+        self.assertEqual(sheet.column_dimensions["A"].width, 30)
+        self.assertEqual(
+            [str(cell_range) for cell_range in sheet.merged_cells.ranges],
+            ["A1:B1"],
+        )
+
+    def test_render_template_parsed_once(self):
+        """Тест чтения заголовка из разобранного один раз шаблона"""
+        load = Mock(side_effect=openpyxl.load_workbook)
+        with patch(
+            "file_downloader.renders.xlsx_templates",
+            TemplateCache(load, make_copy=None),
+        ), patch("openpyxl.load_workbook") as load_workbook:
+            for _ in range(2):
+                with tempfile.NamedTemporaryFile(
+                    suffix=".xlsx", dir=self.root
+                ) as outfile:
+                    render_xlsx_stream(
+                        self.template, {"tbl_contents": iter([])}, outfile
+                    )
+        load.assert_called_once_with(str(self.template))
+        load_workbook.assert_not_called()
+
+    def test_build_file_task_render_name(self):
+        """Тест выбора функции формирования файла по имени"""
+        task = BuildFileTask()
+        task.template_file_path = self.template
+        task.temp_file_extension = "xlsx"
+        task.render_name = "xlsx_stream"
+        task.get_file_context = lambda: {"tbl_contents": iter([("A", "B")])}
+        with override_output_storage(self.root):
+            key = task.build()
+        self.assertTrue(key.endswith(".xlsx"))
+        workbook = openpyxl.load_workbook(self.root / key)
+        self.assertEqual(workbook.active.max_row, 3)
+
+    def test_register_render_ok(self):
+        """Тест регистрации функции формирования файла"""
+        render = Mock()
+        register_render("test", render)
+        self.addCleanup(renders_list.pop, "test")
+        self.assertIs(renders_list["test"], render)
+
+    @parameterized.expand([(None, Mock()), (b"test", Mock()), ("test", None)])
+    def test_register_render_error(self, name, render):
+        """Тест регистрации функции формирования файла с ошибкой"""
+        with self.assertRaises(ValueError):
+            register_render(name, render)
+        self.assertNotIn("test", renders_list)
+
+
+class TaskEventsTests(TestCase):
+    """Тесты событий со статусом задачи"""
+
+    def _make_backend(self, meta, messages):
+        backend = Mock(spec=["client", "get_key_for_task"])
+        backend.get_task_meta = Mock(return_value=meta)
+        backend.decode_result = lambda data: data
+        backend.get_key_for_task.return_value = b"celery-task-meta-1"
+        pubsub = backend.client.pubsub.return_value
+        pubsub.get_message.side_effect = [
+            message and {"data": message} for message in messages
+        ]
+        return backend
+
+    def _iter(self, backend, timeout=60, keepalive=0):
+        with patch("file_downloader.events.AsyncResult") as result:
+            result.return_value.backend = backend
+            return list(iter_task_meta("1", timeout, keepalive))
+
+    def test_iter_task_meta_ok(self):
+        """Тест получения изменений статуса задачи из Redis"""
+        pending = {"status": "PENDING"}
+        started = {"status": "STARTED"}
+        success = {"status": "SUCCESS"}
+        backend = self._make_backend(pending, [None, started, success])
+
+        self.assertEqual(
+            self._iter(backend), [pending, None, started, success]
+        )
+        pubsub = backend.client.pubsub.return_value
+        pubsub.subscribe.assert_called_once_with(b"celery-task-meta-1")
+        pubsub.close.assert_called_once()
+
+    def test_iter_task_meta_ready(self):
+        """Тест событий завершённой задачи"""
+        backend = self._make_backend({"status": "FAILURE"}, [])
+        self.assertEqual(self._iter(backend), [{"status": "FAILURE"}])
+
+    def test_iter_task_meta_timeout(self):
+        """Тест завершения потока событий по истечении времени"""
+        backend = self._make_backend({"status": "PENDING"}, [])
+        self.assertEqual(
+            self._iter(backend, timeout=0), [{"status": "PENDING"}]
+        )
+
+    def test_iter_task_meta_polling(self):
+        """Тест опроса хранилища результатов без Redis"""
+        backend = Mock(spec=["get_task_meta"])
+        backend.get_task_meta.side_effect = [
+            {"status": "PENDING"},
+            {"status": "SUCCESS"},
+        ]
+        with patch("file_downloader.events.time.sleep") as sleep:
+            metas = self._iter(backend)
+        self.assertEqual(metas, [{"status": "PENDING"}, {"status": "SUCCESS"}])
+        sleep.assert_called_once()
+
+    def test_view_ok(self):
+        """Тест потока событий представления"""
+        metas = [{"status": "PENDING", "result": None}, None]
+        metas.append({"status": "SUCCESS", "result": "/tmp/file.docx"})
+        with patch(
+            "file_downloader.views.iter_task_meta", return_value=iter(metas)
+        ):
+            response = TaskEventsView.as_view()(
+                RequestFactory().get("/events/"), task_id="1"
+            )
+            content = b"".join(response.streaming_content).decode()
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertEqual(response["X-Accel-Buffering"], "no")
+        self.assertEqual(
+            content,
+            "retry: 1000\n\n"
+            'data: {"task_status": "PENDING"}\n\n'
+            ": keepalive\n\n"
+            'data: {"task_status": "SUCCESS"}\n\n',
+        )
+
+
+class ProgressTests(TestCase):
+    """Тесты отчёта о ходе формирования файла"""
+
+    def setUp(self):
+        self.task = celery_app.register_task(BuildFileTask())
+        self.task.push_request(id="1")
+        self.addCleanup(self.task.pop_request)
+        patcher = patch.object(self.task, "update_state")
+        self.update_state = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_report_progress_throttled(self):
+        """Тест ограничения частоты обновления состояния задачи"""
+        self.task.report_progress("query")
+        for current in range(1, 101):
+            self.task.report_progress("render", current, 400)
+        self.task.report_progress("save")
+
+        self.assertEqual(
+            self.update_state.call_args_list,
+            [
+                call(
+                    state="PROGRESS",
+                    meta={
+                        "phase": phase,
+                        "current": current,
+                        "total": total,
+                        "percent": percent,
+                    },
+                )
+                for phase, current, total, percent in (
+                    ("query", 0, None, None),
+                    ("render", 1, 400, 0),
+                    ("save", 0, None, None),
+                )
+            ],
+        )
+
+    def test_report_progress_interval(self):
+        """Тест обновления состояния по истечении интервала"""
+        self.task.progress_interval = 0
+        self.task.report_progress("render", 1, 2)
+        self.task.report_progress("render", 2, 2)
+        self.assertEqual(self.update_state.call_count, 2)
+        self.assertEqual(
+            self.update_state.call_args.kwargs["meta"]["percent"], 100
+        )
+
+    def test_report_progress_without_request(self):
+        """Тест вызова задачи вне рабочего процесса"""
+        self.task.pop_request()
+        self.task.report_progress("query")
+        self.task.push_request(id="1")
+        self.update_state.assert_not_called()
+
+    @parameterized.expand([(render_xlsx,), (render_xlsx_stream,)])
+    def test_render_progress(self, render):
+        """Тест отчёта о записанных строках"""
+        with tempfile.TemporaryDirectory() as directory:
+            template = Path(directory) / "template.xlsx"
+            openpyxl.Workbook().save(template)
+            progress = Mock()
+            with open(Path(directory) / "out.xlsx", "wb") as outfile:
+                render(
+                    template,
+                    {"tbl_contents": iter([["A"], ["B"]]), "tbl_total": 2},
+                    outfile,
+                    progress=progress,
+                )
+        self.assertEqual(
+            progress.call_args_list,
+            [
+                call("render", 0, 2),
+                call("render", 1, 2),
+                call("render", 2, 2),
+                call("save"),
+            ],
+        )
+
+    @parameterized.expand(
+        [
+            ("PENDING", None, {"task_status": "PENDING"}),
+            (
+                "PROGRESS",
+                {"phase": "render", "percent": 50},
+                {
+                    "task_status": "PROGRESS",
+                    "progress": {"phase": "render", "percent": 50},
+                },
+            ),
+        ]
+    )
+    def test_task_status_view(self, status, info, expected):
+        """Тест статуса задачи с ходом формирования файла"""
+        result = Mock(status=status, info=info)
+        with patch("file_downloader.views.AsyncResult", return_value=result):
+            response = TaskStatusView.as_view()(
+                RequestFactory().get("/status/"), task_id="1"
+            )
+        self.assertEqual(json.loads(response.content), expected)
+
+
+class InlineBuildTests(TestCase):
+    """Тесты формирования небольших файлов в веб-процессе"""
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = Path(self.directory.name)
+        self.template = self.root / "template.docx"
+        document = docx.Document()
+        document.add_paragraph("Пациент {{ name }}")
+        document.save(self.template)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_pool_submit_ok(self):
+        """Тест выполнения функции в пуле потоков"""
+        pool = InlinePool(1, timeout=5)
+        self.assertEqual(pool.submit(lambda a, b=0: a + b, 1, b=2).result(), 3)
+        self.assertEqual(
+            pool.submit(threading.current_thread).result().name[:15],
+            "file_downloader",
+        )
+
+    def test_pool_submit_busy(self):
+        """Тест отказа при занятых потоках"""
+        pool = InlinePool(1, timeout=5)
+        event = threading.Event()
+        future = pool.submit(event.wait, 5)
+        self.assertIsNone(pool.submit(lambda: "result"))
+        event.set()
+        future.result()
+        time.sleep(0.1)
+        self.assertEqual(pool.submit(lambda: "result").result(), "result")
+
+    def test_pool_submit_error(self):
+        """Тест ошибки функции в пуле потоков"""
+        pool = InlinePool(1, timeout=5)
+        with self.assertRaises(ZeroDivisionError):
+            pool.submit(lambda: 1 / 0).result()
+        time.sleep(0.1)
+        self.assertEqual(pool.submit(lambda: "result").result(), "result")
+
+    @parameterized.expand([(0,), (-1,)])
+    def test_pool_disabled(self, max_workers):
+        """Тест отключения формирования файлов в веб-процессе"""
+        with override_settings(FILE_DOWNLOADER_INLINE_WORKERS=max_workers):
+            self.assertIsNone(get_inline_pool())
+        with self.assertRaises(ValueError):
+            InlinePool(max_workers, timeout=5)
+
+    def test_build_inline_ok(self):
+        """Тест формирования файла новым экземпляром задачи"""
+
+        class Task(BuildFileTask):
+            def get_file_context(self):
+                return {"name": self.name_value}
+
+        task = celery_app.register_task(Task())
+        with override_output_storage(self.root):
+            key = task.build_inline(
+                str(self.template), "docx", name_value="Иванов"
+            )
+        self.assertFalse(hasattr(task, "name_value"))
+        self.assertEqual(
+            docx.Document(self.root / key).paragraphs[0].text,
+            "Пациент Иванов",
+        )
+
+    def _make_view(self, task, inline=True):
+        return type(
+            "View",
+            (CreateFileDocxView,),
+            {
+                "template_file_path": str(self.template),
+                "download_url": "hospitalizations:download_docx",
+                "task": task,
+                "task_kwargs": {"pk": 1},
+                "inline": inline,
+            },
+        ).as_view()
+
+    def test_create_file_view_inline(self):
+        """Тест формирования файла представлением без Celery"""
+        task = Mock()
+        task.name = "task"
+        task.get_data_version.return_value = None
+        task.build_inline.return_value = "/tmp/file.docx"
+        view = self._make_view(task)
+
+        response = view(RequestFactory().get("/create/"))
+
+        task_id = response.context_data["task_id"]
+        self.assertTrue(response.context_data["cached"])
+        task.build_inline.assert_called_once_with(
+            str(self.template), "docx", pk=1
+        )
+        task.backend.store_result.assert_called_once_with(
+            task_id, "/tmp/file.docx", "SUCCESS"
+        )
+        task.apply_async.assert_not_called()
+
+    def test_create_file_view_inline_timeout(self):
+        """Тест ожидания файла, не сформированного за время ожидания, без
+        повторного формирования в Celery"""
+        event = threading.Event()
+        task = Mock()
+        task.name = "task"
+        task.get_data_version.return_value = None
+        task.build_inline.side_effect = (
+            lambda *args, **kwargs: event.wait(5) and "/tmp/file.docx"
+        )
+        view = self._make_view(task)
+
+        with patch(
+            "file_downloader.views.get_inline_pool",
+            return_value=InlinePool(1, timeout=0.01),
+        ):
+            response = view(RequestFactory().get("/create/"))
+
+        task_id = response.context_data["task_id"]
+        self.assertNotIn("cached", response.context_data)
+        task.apply_async.assert_not_called()
+        task.backend.store_result.assert_not_called()
+        event.set()
+        time.sleep(0.1)
+        task.backend.store_result.assert_called_once_with(
+            task_id, "/tmp/file.docx", "SUCCESS"
+        )
+
+    @parameterized.expand([(True, None), (False, "/tmp/file.docx")])
+    def test_create_file_view_celery(self, inline, path):
+        """Тест передачи формирования файла в Celery"""
+        task = Mock()
+        task.name = "task"
+        task.get_data_version.return_value = None
+        task.build_inline.return_value = path
+        view = self._make_view(task, inline)
+
+        response = view(RequestFactory().get("/create/"))
+
+        self.assertNotIn("cached", response.context_data)
+        task.apply_async.assert_called_once_with(
+            (str(self.template), "docx"),
+            {"pk": 1},
+            task_id=response.context_data["task_id"],
+        )
+        task.backend.store_result.assert_not_called()
+
+
+class SingleFlightTests(TestCase):
+    """Тесты объединения одинаковых задач формирования файлов"""
+
+    def setUp(self):
+        cache.clear()
+        self.single_flight = SingleFlight()
+        self.key = self.single_flight.make_key(
+            "task", "/template.docx", "docx", {"order": "surname", "pk": 1}
+        )
+
+    def test_make_key_ok(self):
+        """Тест построения ключа по задаче и её параметрам"""
+        self.assertEqual(
+            self.key,
+            self.single_flight.make_key(
+                "task", "/template.docx", "docx", {"pk": 1, "order": "surname"}
+            ),
+        )
+        self.assertNotEqual(
+            self.key,
+            self.single_flight.make_key(
+                "task", "/template.docx", "docx", {"pk": 2, "order": "surname"}
+            ),
+        )
+        self.assertIsNone(
+            self.single_flight.make_key(
+                "task", "/template.docx", "docx", {"pk": Mock()}
+            )
+        )
+
+    @parameterized.expand([(False, "first"), (True, None)])
+    def test_claim(self, ready, expected):
+        """Тест присоединения к выполняемой задаче"""
+        self.assertIsNone(self.single_flight.claim(self.key, "first"))
+        result = Mock()
+        result.ready.return_value = ready
+        with patch("file_downloader.cache.AsyncResult", return_value=result):
+            self.assertEqual(
+                self.single_flight.claim(self.key, "second"), expected
+            )
+        self.assertEqual(cache.get(self.key), expected or "second")
+
+    def test_release(self):
+        """Тест освобождения ключа только своей задачей"""
+        self.single_flight.claim(self.key, "first")
+        self.single_flight.release(self.key, "second")
+        self.assertEqual(cache.get(self.key), "first")
+        self.single_flight.release(self.key, "first")
+        self.assertIsNone(cache.get(self.key))
+
+    def _make_view(self, task):
+        return type(
+            "View",
+            (CreateFileDocxView,),
+            {
+                "template_file_path": "/template.docx",
+                "download_url": "hospitalizations:download_docx",
+                "task": task,
+                "task_kwargs": {"pk": 1},
+            },
+        ).as_view()
+
+    def test_create_file_view_attaches(self):
+        """Тест одной задачи для одинаковых одновременных запросов"""
+        task = Mock()
+        task.name = "task"
+        task.get_data_version.return_value = None
+        view = self._make_view(task)
+        request = RequestFactory().get("/create/")
+
+        result = Mock()
+        result.ready.return_value = False
+        with patch("file_downloader.cache.AsyncResult", return_value=result):
+            task_ids = {
+                view(request).context_data["task_id"] for _ in range(3)
+            }
+
+        self.assertEqual(len(task_ids), 1)
+        task.apply_async.assert_called_once()
+
+    @override_settings(FILE_DOWNLOADER_DELETE_AFTER_DOWNLOAD=True)
+    def test_create_file_view_delete_after_download(self):
+        """Тест отдельной задачи для каждого запроса при удалении файлов
+        после скачивания"""
+        task = Mock()
+        task.name = "task"
+        task.get_data_version.return_value = {"count": 1}
+        view = self._make_view(task)
+        request = RequestFactory().get("/create/")
+
+        result = Mock()
+        result.ready.return_value = False
+        with patch("file_downloader.cache.AsyncResult", return_value=result):
+            task_ids = {
+                view(request).context_data["task_id"] for _ in range(3)
+            }
+
+        self.assertEqual(len(task_ids), 3)
+        self.assertEqual(task.apply_async.call_count, 3)
+        task.get_data_version.assert_not_called()
+
+    def test_create_file_view_publish_error(self):
+        """Тест освобождения ключа при ошибке отправки задачи"""
+        task = Mock()
+        task.name = "task"
+        task.get_data_version.return_value = None
+        task.apply_async.side_effect = ConnectionError
+        view = self._make_view(task)
+
+        response = view(RequestFactory().get("/create/"))
+
+        self.assertEqual(response.context_data["error"], "Server unavailable")
+        key = self.single_flight.make_key(
+            "task", "/template.docx", "docx", {"pk": 1}
+        )
+        self.assertIsNone(cache.get(key))
+        task.apply_async.side_effect = None
+        self.assertIn("task_id", view(RequestFactory().get("/")).context_data)
+
+
+class DocxPartsTests(TestCase):
+    """Тесты параллельного формирования документа по частям"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = Path(self.directory.name)
+        self.template = self.root / "template.docx"
+        document = docx.Document()
+        document.add_paragraph("Список больных")
+        document.add_paragraph("{%p for key, value in tbl_contents.items() %}")
+        document.add_paragraph("{{ key }}: {{ value|join(', ') }}")
+        document.add_paragraph("{%p endfor %}")
+        document.save(self.template)
+        self.sections = {
+            "Врач 1": ["Пациент 1", "Пациент 2", "Пациент 3"],
+            "Врач 2": ["Пациент 4"],
+            "Врач 3": ["Пациент 5", "Пациент 6"],
+        }
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _texts(self, path):
+        return [
+            paragraph.text
+            for paragraph in docx.Document(path).paragraphs
+            if paragraph.text
+        ]
+
+    @parameterized.expand(
+        [
+            (1, 1, [["Врач 1", "Врач 2", "Врач 3"]]),
+            (2, 1, [["Врач 1"], ["Врач 2", "Врач 3"]]),
+            (3, 1, [["Врач 1"], ["Врач 2"], ["Врач 3"]]),
+            (10, 1, [["Врач 1"], ["Врач 2"], ["Врач 3"]]),
+            (3, 3, [["Врач 1"], ["Врач 2", "Врач 3"]]),
+            (3, 10, [["Врач 1", "Врач 2", "Врач 3"]]),
+        ]
+    )
+    def test_split_sections_ok(self, parts, min_rows, expected):
+        """Тест разбиения разделов на группы с близким числом строк"""
+        groups = split_sections(self.sections, parts, min_rows)
+        self.assertEqual([list(group) for group in groups], expected)
+        self.assertEqual(
+            {key: rows for group in groups for key, rows in group.items()},
+            self.sections,
+        )
+
+    def test_split_sections_empty(self):
+        """Тест разбиения пустого документа"""
+        self.assertEqual(split_sections({}, 4), [{}])
+        with self.assertRaises(ValueError):
+            split_sections(self.sections, 0)
+
+    def test_compose_docx_ok(self):
+        """Тест объединения частей без повтора заголовка"""
+        documents = []
+        for group in split_sections(self.sections, 3):
+            document = DocxTemplate(self.template)
+            document.render({"tbl_contents": group})
+            path = self.root / f"{len(documents)}.docx"
+            document.save(path)
+            documents.append(docx.Document(path))
+        with tempfile.NamedTemporaryFile(
+            suffix=".docx", dir=self.root, delete=False
+        ) as outfile:
+            compose_docx(documents, outfile)
+        self.assertEqual(
+            self._texts(outfile.name),
+            [
+                "Список больных",
+                "Врач 1: Пациент 1, Пациент 2, Пациент 3",
+                "Врач 2: Пациент 4",
+                "Врач 3: Пациент 5, Пациент 6",
+            ],
+        )
+
+    @parameterized.expand([(1, 1), (3, 1), (3, 10)])
+    def test_build_parts_task_ok(self, parts, min_rows):
+        """Тест формирования документа параллельными задачами"""
+        sections = self.sections
+
+        class Task(BuildDocxPartsFileTask):
+            name = f"test_build_parts_{parts}_{min_rows}"
+
+            def get_file_context(self):
+                return {"tbl_contents": sections}
+
+        task = celery_app.register_task(Task())
+        # Results of the chord are kept in memory instead of Redis
+        backend = CacheBackend(app=celery_app, backend="memory")
+        with patch.object(
+            type(celery_app), "backend", PropertyMock(return_value=backend)
+        ), patch.object(task, "update_state"), patch.object(
+            backend, "store_result", wraps=backend.store_result
+        ) as store_result, override_output_storage(
+            self.root / "reports"
+        ), override_settings(
+            FILE_DOWNLOADER_DOCX_PARTS=parts,
+            FILE_DOWNLOADER_DOCX_PART_ROWS=min_rows,
+        ):
+            result = task.apply((str(self.template), "docx"))
+            key = result.get()
+
+        self.assertEqual(os.listdir(self.root / "reports"), [key])
+        total = len(split_sections(sections, parts, min_rows))
+        self.assertEqual(
+            [
+                item
+                for item in store_result.call_args_list
+                if item.args[2] == "PROGRESS"
+            ],
+            [
+                call(
+                    result.id,
+                    make_progress("render", current, total),
+                    "PROGRESS",
+                )
+                for current in range(1, total + 1)
+                if total > 1
+            ],
+        )
+        self.assertEqual(
+            self._texts(self.root / "reports" / key),
+            [
+                "Список больных",
+                "Врач 1: Пациент 1, Пациент 2, Пациент 3",
+                "Врач 2: Пациент 4",
+                "Врач 3: Пациент 5, Пациент 6",
+            ],
+        )
+
+
+class DocxZipRenderTests(TestCase):
+    """Тесты формирования архива документов"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = Path(self.directory.name)
+        self.template = self.root / "template.docx"
+        document = docx.Document()
+        document.add_paragraph("Пациент {{ name }}")
+        document.save(self.template)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_render_ok(self):
+        """Тест формирования документов из однажды разобранного шаблона"""
+        load = Mock(side_effect=docx.Document)
+        progress = Mock()
+        documents = (
+            (f"{name}.docx", {"name": name}) for name in ("Иванов", "Петров")
+        )
+        with patch(
+            "file_downloader.renders.docx_templates", TemplateCache(load)
+        ), tempfile.NamedTemporaryFile(
+            suffix=".zip", dir=self.root, delete=False
+        ) as outfile:
+            render_docx_zip(
+                self.template,
+                {"tbl_contents": documents, "tbl_total": 2},
+                outfile,
+                progress=progress,
+            )
+
+        load.assert_called_once()
+        self.assertEqual(
+            progress.call_args_list,
+            [
+                call("render", 0, 2),
+                call("render", 1, 2),
+                call("render", 2, 2),
+                call("save"),
+            ],
+        )
+        with zipfile.ZipFile(outfile.name) as archive:
+            self.assertEqual(
+                archive.namelist(), ["Иванов.docx", "Петров.docx"]
+            )
+            self.assertEqual(
+                docx.Document(archive.open("Петров.docx")).paragraphs[0].text,
+                "Пациент Петров",
+            )
+
+
+class BundleFileTaskTests(TestCase):
+    """Тесты архива одного списка в нескольких форматах"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = Path(self.directory.name)
+        document = docx.Document()
+        document.add_paragraph("{{ tbl_contents[0]|join(' ') }}")
+        document.save(self.root / "list.docx")
+        openpyxl.Workbook().save(self.root / "list.xlsx")
+        self.get_file_context = Mock(
+            return_value={"tbl_contents": [("Иванов", "Врач")]}
+        )
+
+        class Task(BuildBundleFileTask):
+            name = "test_build_bundle"
+            bundle_renders = {"docx": "docx", "xlsx": "xlsx_stream"}
+            get_file_context = self.get_file_context
+
+        self.task = celery_app.register_task(Task())
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _build(self, formats):
+        with patch.object(self.task, "update_state"), override_output_storage(
+            self.root / "reports"
+        ):
+            key = self.task.apply(
+                (str(self.root / "list.docx"), "zip"), {"formats": formats}
+            ).get()
+        return zipfile.ZipFile(self.root / "reports" / key)
+
+    @parameterized.expand(
+        [
+            ([], ["list.docx", "list.xlsx"]),
+            (["xlsx"], ["list.xlsx"]),
+            (["xlsx", "docx"], ["list.xlsx", "list.docx"]),
+        ]
+    )
+    def test_build_ok(self, formats, expected):
+        """Тест формирования всех форматов по одному запросу данных"""
+        with self._build(formats) as archive:
+            self.assertEqual(archive.namelist(), expected)
+            if "list.xlsx" in expected:
+                sheet = openpyxl.load_workbook(
+                    archive.open("list.xlsx")
+                ).active
+                self.assertEqual(sheet["A1"].value, "Иванов")
+            if "list.docx" in expected:
+                document = docx.Document(archive.open("list.docx"))
+                self.assertEqual(document.paragraphs[0].text, "Иванов Врач")
+        self.get_file_context.assert_called_once()
+
+    def test_build_unknown_format(self):
+        """Тест ошибки неизвестного формата до запроса данных"""
+        self.task.formats = ["pdf"]
+        with self.assertRaises(ValueError):
+            self.task.build()
+        self.get_file_context.assert_not_called()
+
+
+class CsvRenderTests(TestCase):
+    """Тесты потокового формирования csv"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = Path(self.directory.name)
+        self.template = self.root / "template.csv"
+        self.template.write_text("Пациент,Врач\r\n", encoding="utf-8")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_render_ok(self):
+        """Тест формирования csv из итератора строк"""
+        rows = ((f"Пациент {i}", "Врач, 1") for i in range(1000))
+        progress = Mock()
+        with tempfile.NamedTemporaryFile(
+            suffix=".csv", dir=self.root, delete=False
+        ) as outfile:
+            render_csv(
+                self.template,
+                {"tbl_contents": rows, "tbl_total": 1000},
+                outfile,
+                progress=progress,
+            )
+
+        content = Path(outfile.name).read_bytes()
+        self.assertTrue(content.startswith(codecs.BOM_UTF8))
+        lines = content.decode("utf-8-sig").splitlines()
+        self.assertEqual(len(lines), 1001)
+        self.assertEqual(lines[0], "Пациент,Врач")
+        self.assertEqual(lines[1000], 'Пациент 999,"Врач, 1"')
+        self.assertIsNone(next(rows, None))
+        progress.assert_called_with("save")
+
+    def test_streaming_view_ok(self):
+        """Тест потоковой отдачи csv без задачи"""
+        template = self.template
+
+        class View(StreamingCsvView):
+            filename = "list"
+
+            def get_template_file_path(self):
+                return template
+
+            def get_rows(self):
+                return iter([("Иванов", "Врач")])
+
+        response = View.as_view()(RequestFactory().get("/csv/"))
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertEqual(
+            response["Content-Disposition"], 'attachment; filename="list.csv"'
+        )
+        self.assertEqual(
+            b"".join(response.streaming_content).decode("utf-8-sig"),
+            "Пациент,Врач\r\nИванов,Врач\r\n",
+        )
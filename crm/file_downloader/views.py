@@ -1,17 +1,54 @@
+import codecs
+import csv
 import logging
-from pathlib import PosixPath
+import uuid
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from pathlib import Path, PosixPath
+from urllib.parse import quote
 
+from celery import states
 from celery.result import AsyncResult
-from django.http import HttpResponse, JsonResponse
+from django.conf import settings
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.urls import reverse
+from django.utils.http import content_disposition_header
 from django.views import View
 from django.views.generic import TemplateView
 
-from crm import settings
+from file_downloader.cache import ReportCache, SingleFlight
+from file_downloader.events import (
+    format_event,
+    get_task_status,
+    iter_task_meta,
+)
+from file_downloader.inline import get_inline_pool
+from file_downloader.renders import read_csv_header
+from file_downloader.storage import OutputStore
 
 logger = logging.getLogger("django.console")
 
 
+class OutputFileResponse(FileResponse):
+    """File response removing the file from the output store once the
+    response is closed"""
+
+    def __init__(self, *args, output_store, key, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.output_store = output_store
+        self.key = key
+
+    def close(self):
+        super().close()
+        if self.output_store.delete(self.key, downloaded=True):
+            logger.info(f'{__name__} removed downloaded file "{self.key}"')
+
+
 class CreateFileView(TemplateView):
     task = None
     template_file_path = None
@@ -19,6 +56,11 @@ class CreateFileView(TemplateView):
     template_name = "http_files/create.html"
     download_url = None
     task_kwargs = {}
+    # Build the file in the web process instead of Celery
+    inline = False
+    # Reuse built files and attach to identical tasks in flight, files
+    # shared this way must not be deleted after download
+    share_files = None
 
     __attrs = {
         "template_file_path": (str, PosixPath),
@@ -70,14 +112,134 @@ class CreateFileView(TemplateView):
     def get_template_file_path(self):
         return self.template_file_path
 
+    def get_share_files(self):
+        if self.share_files is not None:
+            return self.share_files
+        return not settings.FILE_DOWNLOADER_DELETE_AFTER_DOWNLOAD
+
+    def get_report_cache(self):
+        return ReportCache()
+
+    def get_report_cache_key(self, report_cache):
+        if not self.get_share_files():
+            return None
+        task = self.get_task()
+        get_data_version = getattr(task, "get_data_version", None)
+        if not callable(get_data_version):
+            return None
+        task_kwargs = self.get_task_kwargs()
+        return report_cache.make_key(
+            getattr(task, "name", None),
+            self.get_template_file_path(),
+            self.get_temp_file_extension(),
+            task_kwargs,
+            get_data_version(**task_kwargs),
+        )
+
+    def get_single_flight(self):
+        return SingleFlight()
+
+    def delay_task(self):
+        """Id of a new task, or of an identical task in flight"""
+        task = self.get_task()
+        task_kwargs = self.get_task_kwargs()
+        template_file_path = str(self.template_file_path)
+        extension = self.get_temp_file_extension()
+        single_flight = self.get_single_flight()
+        key = None
+        if self.get_share_files():
+            key = single_flight.make_key(
+                getattr(task, "name", None),
+                template_file_path,
+                extension,
+                task_kwargs,
+            )
+        task_id = str(uuid.uuid4())
+        if key:
+            in_flight = single_flight.claim(key, task_id)
+            if in_flight:
+                logger.info(f'{__name__} attached to task "{in_flight}"')
+                return in_flight
+        try:
+            task.apply_async(
+                (template_file_path, extension),
+                task_kwargs,
+                task_id=task_id,
+            )
+        except Exception:
+            if key:
+                single_flight.release(key, task_id)
+            raise
+        return task_id
+
+    def is_inline(self):
+        return self.inline
+
+    @staticmethod
+    def __build_and_store(task, task_id, *args, **kwargs):
+        try:
+            key = task.build_inline(*args, **kwargs)
+            if key is None:
+                raise ValueError("File was not built")
+        except Exception as exc:
+            task.backend.mark_as_failure(task_id, exc)
+            raise
+        # Stored like a result of the task, so the file is downloaded and
+        # reused as any other
+        task.backend.store_result(task_id, key, states.SUCCESS)
+        return key
+
+    def build_inline(self):
+        """Id of the result of the file built in the pool of the web
+        process and whether the file is ready, None if the file has to be
+        built by Celery. A build that runs past the timeout keeps its id and
+        stores the result when done, so it is waited for like a task
+        instead of being built again"""
+        pool = get_inline_pool()
+        task = self.get_task()
+        if pool is None or not hasattr(task, "build_inline"):
+            return None
+        task_id = str(uuid.uuid4())
+        future = pool.submit(
+            self.__build_and_store,
+            task,
+            task_id,
+            str(self.template_file_path),
+            self.get_temp_file_extension(),
+            **self.get_task_kwargs(),
+        )
+        if future is None:
+            return None
+        try:
+            future.result(timeout=pool.timeout)
+        except FutureTimeoutError:
+            logger.warning(f'{__name__} waiting for inline "{task_id}"')
+            return task_id, False
+        except Exception as ex:
+            logger.error(f"{__name__} inline build failed {ex}")
+            return None
+        return task_id, True
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         try:
-            result = self.get_task().delay(
-                str(self.template_file_path),
-                self.get_temp_file_extension(),
-                **self.get_task_kwargs(),
-            )
+            report_cache = self.get_report_cache()
+            key = self.get_report_cache_key(report_cache)
+            result = key and report_cache.get(key)
+            if result:
+                logger.info(f'{__name__} reused task "{result}"')
+                context["cached"] = True
+            elif self.is_inline() and (inline := self.build_inline()):
+                result, ready = inline
+                if ready:
+                    logger.info(f'{__name__} built file "{result}" inline')
+                    context["cached"] = True
+                if key:
+                    report_cache.set(key, result)
+            else:
+                result = self.delay_task()
+                if key:
+                    report_cache.set(key, result)
         except Exception as ex:
             logger.error(f"{__name__} connection refused {ex}")
             context["error"] = "Server unavailable"
@@ -92,6 +254,9 @@ class DownloadFileView(View):
     content_type = None
     filename = None
     extension = None
+    accel_redirect_url = None
+    # Files of views deleting them are created with share_files = False
+    delete_after_download = None
 
     __attrs = {
         "content_type": (str, PosixPath),
@@ -125,25 +290,156 @@ class DownloadFileView(View):
     def get_content_type(self):
         return self.content_type
 
-    def get(self, request, task_id, *args, **kwargs):
-        result = AsyncResult(task_id)
-        filename = result.result
-        logger.info(f'{__name__} opening file "{filename}"')
-        with open(filename, "rb") as file:
-            response = HttpResponse(file, content_type=self.get_content_type())
-            response[
-                "Content-Disposition"
-            ] = "attachment; filename={}.{}".format(
-                self.get_filename(), self.get_extension()
+    def get_accel_redirect_url(self):
+        if self.accel_redirect_url is not None:
+            return self.accel_redirect_url
+        return settings.FILE_DOWNLOADER_ACCEL_REDIRECT_URL
+
+    def get_delete_after_download(self):
+        if self.delete_after_download is not None:
+            return self.delete_after_download
+        return settings.FILE_DOWNLOADER_DELETE_AFTER_DOWNLOAD
+
+    def get_output_store(self):
+        return OutputStore()
+
+    def get_file_key(self, task_id):
+        return AsyncResult(task_id).result
+
+    def get_attachment_filename(self):
+        return f"{self.get_filename()}.{self.get_extension()}"
+
+    def make_accel_response(self, path, accel_redirect_url):
+        """Response that lets nginx send the file from an internal location,
+        None if the file is outside FILE_DOWNLOADER_ROOT"""
+        try:
+            relative_path = path.resolve().relative_to(
+                Path(settings.FILE_DOWNLOADER_ROOT).resolve()
             )
-            logger.info(f'{__name__} make response with file "{filename}"')
-            return response
+        except ValueError:
+            return None
+        response = HttpResponse(content_type=self.get_content_type())
+        response["X-Accel-Redirect"] = "{}/{}".format(
+            accel_redirect_url.rstrip("/"), quote(relative_path.as_posix())
+        )
+        response["Content-Disposition"] = content_disposition_header(
+            True, self.get_attachment_filename()
+        )
+        return response
+
+    def make_file_response(self, output_store, key):
+        kwargs = {
+            "as_attachment": True,
+            "filename": self.get_attachment_filename(),
+            "content_type": self.get_content_type(),
+        }
+        if self.get_delete_after_download():
+            # Files sent by nginx are left to the reaper of the store
+            response = OutputFileResponse(
+                output_store.open(key),
+                output_store=output_store,
+                key=key,
+                **kwargs,
+            )
+        else:
+            response = FileResponse(output_store.open(key), **kwargs)
+        response.block_size = settings.FILE_DOWNLOADER_CHUNK_SIZE
+        return response
+
+    def get(self, request, task_id, *args, **kwargs):
+        key = self.get_file_key(task_id)
+        output_store = self.get_output_store()
+        if not output_store.exists(key):
+            raise Http404("File not found")
+        accel_redirect_url = self.get_accel_redirect_url()
+        path = output_store.path(key)
+        response = None
+        if accel_redirect_url and path is not None:
+            response = self.make_accel_response(path, accel_redirect_url)
+        if response is None:
+            logger.info(f'{__name__} opening file "{key}"')
+            response = self.make_file_response(output_store, key)
+        logger.info(f'{__name__} make response with file "{key}"')
+        return response
 
 
 class TaskStatusView(View):
     def get(self, request, task_id, *args, **kwargs):
         result = AsyncResult(task_id)
-        return JsonResponse({"task_status": result.status})
+        return JsonResponse(
+            get_task_status({"status": result.status, "result": result.info})
+        )
+
+
+class TaskEventsView(View):
+    """Server-sent events with the status of the task, the stream ends when
+    the task is ready or after FILE_DOWNLOADER_EVENTS_TIMEOUT seconds and
+    the browser reconnects"""
+
+    retry = 1000
+
+    def iter_events(self, task_id):
+        yield f"retry: {self.retry}\n\n"
+        for meta in iter_task_meta(
+            task_id,
+            timeout=settings.FILE_DOWNLOADER_EVENTS_TIMEOUT,
+            keepalive=settings.FILE_DOWNLOADER_EVENTS_KEEPALIVE,
+        ):
+            yield format_event(meta and get_task_status(meta))
+
+    def get(self, request, task_id, *args, **kwargs):
+        response = StreamingHttpResponse(
+            self.iter_events(task_id), content_type="text/event-stream"
+        )
+        response["Cache-Control"] = "no-cache"
+        # Events are sent through nginx without buffering
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+
+class _Echo:
+    """File-like object returning the written value"""
+
+    def write(self, value):
+        return value
+
+
+class StreamingCsvView(View):
+    """Csv file written to the response while the rows are read, for sets
+    of rows small enough to skip building the file by a task"""
+
+    template_file_path = None
+    filename = "file"
+
+    def get_template_file_path(self):
+        return settings.MEDIA_ROOT / self.template_file_path
+
+    def get_rows(self):
+        raise NotImplementedError(
+            "Can't use 'get_rows' on an StreamingCsvView"
+        )
+
+    def iter_csv(self):
+        writer = csv.writer(_Echo())
+        yield codecs.BOM_UTF8
+        for row in read_csv_header(self.get_template_file_path()):
+            yield writer.writerow(row).encode()
+        for row in self.get_rows():
+            yield writer.writerow(row).encode()
+
+    def get(self, request, *args, **kwargs):
+        response = StreamingHttpResponse(
+            self.iter_csv(), content_type="text/csv; charset=utf-8"
+        )
+        response["Content-Disposition"] = content_disposition_header(
+            True, f"{self.filename}.csv"
+        )
+        return response
+
+
+class OutputStoreMetricsView(View):
+    def get(self, request, *args, **kwargs):
+        return JsonResponse(OutputStore().get_metrics())
 
 
 class DownloadFileXlsxView(DownloadFileView):
@@ -163,9 +459,29 @@ class DownloadFileDocxView(DownloadFileView):
     extension = "docx"
 
 
+class DownloadFileZipView(DownloadFileView):
+    content_type = "application/zip"
+    filename = "file"
+    extension = "zip"
+
+
+class DownloadFileCsvView(DownloadFileView):
+    content_type = "text/csv; charset=utf-8"
+    filename = "file"
+    extension = "csv"
+
+
 class CreateFileXlsxView(CreateFileView):
     temp_file_extension = "xlsx"
 
 
 class CreateFileDocxView(CreateFileView):
     temp_file_extension = "docx"
+
+
+class CreateFileZipView(CreateFileView):
+    temp_file_extension = "zip"
+
+
+class CreateFileCsvView(CreateFileView):
+    temp_file_extension = "csv"
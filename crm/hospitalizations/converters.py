@@ -1,4 +1,7 @@
-from typing import Any
+from typing import Any, Optional
+
+from django.db.models import Expression, Value
+from django.db.models.functions import Concat
 
 from tables.converters import Converter
 
@@ -10,3 +13,12 @@ class FioConverter(Converter):
 
     def convert(self, value: Any) -> Any:
         return str(value).split(",")[0]
+
+    def annotate(self, name: str) -> Optional[Expression]:
+        return Concat(
+            f"{name}__surname",
+            Value(" "),
+            f"{name}__name",
+            Value(" "),
+            f"{name}__patronymic",
+        )
@@ -1,8 +1,19 @@
 from django.contrib.auth import get_user_model
-from django.db.models import CharField, F, Func, Q, TextField, Value
-from django.db.models.functions import Concat
+from django.db.models import (
+    CharField,
+    Count,
+    F,
+    Func,
+    Max,
+    Q,
+    TextField,
+    Value,
+)
+from django.db.models.functions import Concat, TruncDate
 from django.shortcuts import get_object_or_404
+from django.utils.text import get_valid_filename
 
+from file_downloader.context import select_fields, to_dict
 from hospitalizations.models import Hospitalization
 
 
@@ -38,11 +49,159 @@ def get_one(pk):
     return get_object_or_404(Hospitalization, pk=pk)
 
 
+def get_document(pk, fields):
+    """Fields of the hospitalization as a plain dict read by one query"""
+    queryset = select_fields(Hospitalization.objects.filter(pk=pk), fields)
+    return to_dict(get_object_or_404(queryset), fields)
+
+
+def _get_documents(pks=None, selected_doctor=0):
+    """Hospitalizations by their pks, the current ones of the selected
+    doctor without pks"""
+    if pks:
+        return Hospitalization.objects.filter(pk__in=pks)
+    return get_all_current(selected_doctor)
+
+
+def _get_document_name(obj):
+    patient = obj.patient
+    name = " ".join(
+        filter(None, (patient.surname, patient.name, patient.patronymic))
+    )
+    return get_valid_filename(f"{name} {obj.pk}.docx")
+
+
 def get(pk):
     return Hospitalization.objects.filter(pk=pk)
 
 
+def get_version(queryset):
+    return queryset.order_by().aggregate(
+        count=Count("pk"),
+        time_update=Max("time_update"),
+        patient_time_update=Max("patient__time_update"),
+    )
+
+
+# Doctor and diagnosis fields shown by the files, the doctor and the
+# diagnosis models keep no time of update
+DOCTOR_FIELDS = (
+    "doctor__last_name",
+    "doctor__first_name",
+    "doctor__patronymic",
+)
+DOCUMENT_RELATED_FIELDS = (
+    *DOCTOR_FIELDS,
+    "diagnosis__diagnosis",
+    "diagnosis__icd_code",
+)
+
+
+def get_related_version(queryset, fields):
+    version = get_version(queryset)
+    version["related"] = list(
+        queryset.order_by(*fields).values_list(*fields).distinct()
+    )
+    return version
+
+
+def get_documents_version(queryset):
+    return get_related_version(queryset, DOCUMENT_RELATED_FIELDS)
+
+
 class FileContent:
+    @staticmethod
+    def get_current_version(selected_doctor=0):
+        queryset = Hospitalization.current.all()
+        if selected_doctor:
+            queryset = queryset.filter(doctor__pk=selected_doctor)
+        return get_related_version(queryset, DOCTOR_FIELDS)
+
+    @staticmethod
+    def get_one_version(pk):
+        return get_documents_version(Hospitalization.objects.filter(pk=pk))
+
+    @staticmethod
+    def get_documents_version(pks=None, selected_doctor=0):
+        return get_documents_version(_get_documents(pks, selected_doctor))
+
+    @staticmethod
+    def get_documents(fields, pks=None, selected_doctor=0, chunk_size=200):
+        """Contexts of the documents of the hospitalizations with the names
+        of their files, fetched in chunks by a server-side cursor"""
+        order = ("patient__surname", "patient__name", "patient__patronymic")
+        queryset = select_fields(
+            _get_documents(pks, selected_doctor), (*fields, *order)
+        ).order_by(*order, "pk")
+        return {
+            "tbl_contents": (
+                (_get_document_name(obj), {"obj": to_dict(obj, fields)})
+                for obj in queryset.iterator(chunk_size=chunk_size)
+            ),
+            "tbl_total": queryset.count(),
+        }
+
+    @staticmethod
+    def get_history_version():
+        return get_documents_version(Hospitalization.objects.all())
+
+    @staticmethod
+    def get_history_rows(patient_pk=None):
+        """Hospitalizations of the patient, of all patients without the
+        patient, as rows of plain values"""
+        queryset = Hospitalization.objects.all()
+        if patient_pk:
+            queryset = queryset.filter(patient__pk=patient_pk)
+        return (
+            queryset.annotate(
+                patient_fio=Concat(
+                    "patient__surname",
+                    Value(" "),
+                    "patient__name",
+                    Value(" "),
+                    "patient__patronymic",
+                    output_field=CharField(),
+                ),
+                doctor_fio=Concat(
+                    "doctor__last_name",
+                    Value(" "),
+                    "doctor__first_name",
+                    Value(" "),
+                    "doctor__patronymic",
+                    output_field=CharField(),
+                ),
+                entry_day=TruncDate("entry_date"),
+                leaving_day=TruncDate("leaving_date"),
+            )
+            .values_list(
+                "number",
+                "patient_fio",
+                "patient__birthday",
+                "entry_day",
+                "leaving_day",
+                "doctor_fio",
+                "diagnosis__icd_code",
+                "diagnosis__diagnosis",
+                "custom_diagnosis",
+            )
+            .order_by(
+                "patient__surname",
+                "patient__name",
+                "patient__patronymic",
+                "entry_date",
+            )
+        )
+
+    @staticmethod
+    def get_history_iterator(chunk_size=2000):
+        """Rows of all hospitalizations fetched in chunks by a server-side
+        cursor"""
+        rows = FileContent.get_history_rows()
+        return {
+            "tbl_contents": rows.iterator(chunk_size=chunk_size),
+            "tbl_total": rows.count(),
+        }
+
     @staticmethod
     def get_current_by_doctors():
         queryset = get_user_model().objects.filter(
@@ -83,7 +242,7 @@ class FileContent:
         return data
 
     @staticmethod
-    def get_current(selected_doctor, **kwargs):
+    def get_current_rows(selected_doctor, **kwargs):
         if selected_doctor:
             queryset = Hospitalization.current.filter(
                 doctor__pk=selected_doctor
@@ -91,48 +250,63 @@ class FileContent:
         else:
             queryset = Hospitalization.current
         queryset = _get_order(queryset, **kwargs)
-        return {
-            "tbl_contents": list(
-                queryset.annotate(
-                    formatted_entry_date=Func(
-                        F("entry_date"),
-                        Value("DD.MM.YYYY"),
-                        function="TO_CHAR",
-                        output_field=TextField(),
-                    )
-                )
-                .annotate(
-                    formatted_birthday=Func(
-                        F("patient__birthday"),
-                        Value("DD.MM.YYYY"),
-                        function="TO_CHAR",
-                        output_field=TextField(),
-                    )
+        return (
+            queryset.annotate(
+                formatted_entry_date=Func(
+                    F("entry_date"),
+                    Value("DD.MM.YYYY"),
+                    function="TO_CHAR",
+                    output_field=TextField(),
                 )
-                .annotate(
-                    doctor_fio=Concat(
-                        "doctor__last_name",
-                        Value(" "),
-                        "doctor__first_name",
-                        Value(" "),
-                        "doctor__patronymic",
-                        output_field=CharField(),
-                    )
+            )
+            .annotate(
+                formatted_birthday=Func(
+                    F("patient__birthday"),
+                    Value("DD.MM.YYYY"),
+                    function="TO_CHAR",
+                    output_field=TextField(),
                 )
-                .annotate(
-                    patient_fio=Concat(
-                        "patient__surname",
-                        Value(" "),
-                        "patient__name",
-                        Value(" "),
-                        "patient__patronymic",
-                    )
+            )
+            .annotate(
+                doctor_fio=Concat(
+                    "doctor__last_name",
+                    Value(" "),
+                    "doctor__first_name",
+                    Value(" "),
+                    "doctor__patronymic",
+                    output_field=CharField(),
                 )
-                .values_list(
-                    "patient_fio",
-                    "formatted_birthday",
-                    "formatted_entry_date",
-                    "doctor_fio",
+            )
+            .annotate(
+                patient_fio=Concat(
+                    "patient__surname",
+                    Value(" "),
+                    "patient__name",
+                    Value(" "),
+                    "patient__patronymic",
                 )
             )
+            .values_list(
+                "patient_fio",
+                "formatted_birthday",
+                "formatted_entry_date",
+                "doctor_fio",
+            )
+        )
+
+    @staticmethod
+    def get_current(selected_doctor, **kwargs):
+        return {
+            "tbl_contents": list(
+                FileContent.get_current_rows(selected_doctor, **kwargs)
+            )
+        }
+
+    @staticmethod
+    def get_current_iterator(selected_doctor, chunk_size=2000, **kwargs):
+        """Rows fetched in chunks by a server-side cursor"""
+        rows = FileContent.get_current_rows(selected_doctor, **kwargs)
+        return {
+            "tbl_contents": rows.iterator(chunk_size=chunk_size),
+            "tbl_total": rows.count(),
         }
@@ -1,14 +1,21 @@
 from crm import celery_app
-from file_downloader.tasks import BuildFileTask
+from file_downloader.tasks import (
+    BuildBundleFileTask,
+    BuildDocxPartsFileTask,
+    BuildFileTask,
+)
 from hospitalizations import service
 
 
-class BuildCurrentByDoctorsDocxFileTask(BuildFileTask):
+class BuildCurrentByDoctorsDocxFileTask(BuildDocxPartsFileTask):
     def get_file_context(self):
         return {
             "tbl_contents": service.FileContent.get_current_by_doctors(),
         }
 
+    def get_data_version(self, **kwargs):
+        return service.FileContent.get_current_version()
+
 
 class BuildCurrentDocxFileTask(BuildFileTask):
     def get_file_context(self, **kwargs):
@@ -18,8 +25,27 @@ class BuildCurrentDocxFileTask(BuildFileTask):
             direction=self.direction,
         )
 
+    def get_data_version(self, selected_doctor=0, **kwargs):
+        return service.FileContent.get_current_version(selected_doctor)
+
 
 class BuildCurrentXlsxFileTask(BuildFileTask):
+    render_name = "xlsx_stream"
+
+    def get_file_context(self, **kwargs):
+        return service.FileContent.get_current_iterator(
+            selected_doctor=self.selected_doctor,
+            order=self.order,
+            direction=self.direction,
+        )
+
+    def get_data_version(self, selected_doctor=0, **kwargs):
+        return service.FileContent.get_current_version(selected_doctor)
+
+
+class BuildCurrentBundleFileTask(BuildBundleFileTask):
+    bundle_renders = {"docx": "docx", "xlsx": "xlsx_stream", "csv": "csv"}
+
     def get_file_context(self, **kwargs):
         return service.FileContent.get_current(
             selected_doctor=self.selected_doctor,
@@ -27,10 +53,56 @@ class BuildCurrentXlsxFileTask(BuildFileTask):
             direction=self.direction,
         )
 
+    def get_data_version(self, selected_doctor=0, **kwargs):
+        return service.FileContent.get_current_version(selected_doctor)
+
+
+class BuildHistoryCsvFileTask(BuildFileTask):
+    def get_file_context(self, **kwargs):
+        return service.FileContent.get_history_iterator()
+
+    def get_data_version(self, **kwargs):
+        return service.FileContent.get_history_version()
+
 
 class BuildDocxFileTask(BuildFileTask):
+    # Fields used by the reference and referral templates
+    context_fields = (
+        "entry_date",
+        "leaving_date",
+        "patient__surname",
+        "patient__name",
+        "patient__patronymic",
+        "patient__birthday",
+        "patient__residential_address",
+        "doctor",
+        "diagnosis__diagnosis",
+        "diagnosis__icd_code",
+    )
+
     def get_file_context(self, **kwargs):
-        return {"obj": service.get_one(self.pk)}
+        return {"obj": service.get_document(self.pk, self.context_fields)}
+
+    def get_data_version(self, pk=None, **kwargs):
+        return service.FileContent.get_one_version(pk)
+
+
+class BuildDocumentsZipFileTask(BuildFileTask):
+    """Archive of the documents of many hospitalizations rendered from one
+    parsed template"""
+
+    render_name = "docx_zip"
+    context_fields = BuildDocxFileTask.context_fields
+
+    def get_file_context(self, **kwargs):
+        return service.FileContent.get_documents(
+            self.context_fields,
+            pks=self.pks,
+            selected_doctor=self.selected_doctor,
+        )
+
+    def get_data_version(self, pks=None, selected_doctor=0, **kwargs):
+        return service.FileContent.get_documents_version(pks, selected_doctor)
 
 
 BuildCurrentByDoctorsDocxFileTask = celery_app.register_task(
@@ -38,4 +110,11 @@ BuildCurrentByDoctorsDocxFileTask = celery_app.register_task(
 )
 BuildCurrentDocxFileTask = celery_app.register_task(BuildCurrentDocxFileTask())
 BuildCurrentXlsxFileTask = celery_app.register_task(BuildCurrentXlsxFileTask())
+BuildCurrentBundleFileTask = celery_app.register_task(
+    BuildCurrentBundleFileTask()
+)
 BuildDocxFileTask = celery_app.register_task(BuildDocxFileTask())
+BuildDocumentsZipFileTask = celery_app.register_task(
+    BuildDocumentsZipFileTask()
+)
+BuildHistoryCsvFileTask = celery_app.register_task(BuildHistoryCsvFileTask())
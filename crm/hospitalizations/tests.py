@@ -1,18 +1,32 @@
+import csv
+import io
+import re
+import tempfile
+import zipfile
 import zoneinfo
 from datetime import datetime
 from http import HTTPStatus
+from pathlib import Path
 from unittest.mock import Mock, patch
 
+import docx
 from django import forms as django_forms
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
 from django.http import HttpResponse
 from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from parameterized import parameterized
 
 import file_downloader
-from hospitalizations import forms
+from file_downloader.renders import render_csv, render_docx, render_docx_zip
+from hospitalizations import forms, tasks, views
+from hospitalizations.converters import FioConverter
 from hospitalizations.models import Diagnosis, Hospitalization
+from hospitalizations.tables import CurrentHospitalizationsTable
 from hospitalizations.utils import (
     check_dates_intersection,
     validate_hospitalization_fields,
@@ -33,6 +47,7 @@ class AuthorizedUserTestCase(TestCase):
     }
 
     def setUp(self):
+        cache.clear()
         self.client.post(reverse("users:login"), self._user)
 
 
@@ -105,7 +120,7 @@ class HospitalizationViewTests(AuthorizedUserTestCase):
         """Тест вывода списка всех госпитализаций"""
         path = reverse(viewname, kwargs=kwargs)
         response = self.client.get(path)
-        content = response.content.decode()
+        content = response.getvalue().decode()
         for d in data:
             self.assertIn(d, content)
 
@@ -280,6 +295,297 @@ class HospitalizationViewTests(AuthorizedUserTestCase):
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
 
 
+class HospitalizationStreamingViewTests(AuthorizedUserTestCase):
+    """Тесты потоковой отдачи таблиц"""
+
+    _headers = {"HTTP_HX-Request": "true"}
+
+    @parameterized.expand(
+        [
+            (
+                views.CurrentHospitalizationsList,
+                "hospitalizations:current",
+                {},
+            ),
+            (
+                views.CurrentHospitalizationsList,
+                "hospitalizations:current",
+                {"order": "entry_date", "direction": "desc"},
+            ),
+            (
+                views.HospitalizationsList,
+                "hospitalizations:hospitalizations",
+                {"pk": 4},
+            ),
+        ]
+    )
+    def test_streaming_table_ok(self, view, viewname, kwargs):
+        """Тест совпадения потоковой и обычной отдачи таблицы"""
+        path = reverse(viewname, kwargs=kwargs)
+        for headers in (self._headers, {}):
+            with patch.object(view, "table_paginate_by", None):
+                response = self.client.get(path, **headers)
+            self.assertFalse(response.streaming)
+            expected = response.content.decode()
+
+            with patch.multiple(
+                view,
+                table_streaming=True,
+                table_chunk_size=1,
+                table_paginate_by=None,
+            ):
+                response = self.client.get(path, **headers)
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+            self.assertTrue(response.streaming)
+            content = b"".join(response.streaming_content).decode()
+            self.assertIn("<tbody>", content)
+            self.assertEqual(
+                self._normalize(content), self._normalize(expected)
+            )
+
+    def test_paginated_table_not_streaming(self):
+        """Тест обычной отдачи страницы таблицы с постраничным выводом"""
+        path = reverse("hospitalizations:hospitalizations", kwargs={"pk": 4})
+        with patch.object(views.HospitalizationsList, "table_streaming", True):
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertFalse(response.streaming)
+        self.assertIn("<tbody>", response.content.decode())
+
+    def test_streaming_table_without_marker(self):
+        """Тест обычной отдачи таблицы шаблоном без метки строк"""
+        path = reverse("hospitalizations:hospitalizations", kwargs={"pk": 4})
+        options = settings.TEMPLATES[0]["OPTIONS"]
+        templates = {
+            "rows.html": (
+                "{% for object in table.body_rows %}"
+                "{% include 'tables/tr.html' %}{% endfor %}"
+            )
+        }
+        loaders = [
+            ("django.template.loaders.locmem.Loader", templates),
+            "django.template.loaders.filesystem.Loader",
+            "django.template.loaders.app_directories.Loader",
+        ]
+        with self.settings(
+            TEMPLATES=[
+                {
+                    **settings.TEMPLATES[0],
+                    "APP_DIRS": False,
+                    "OPTIONS": {**options, "loaders": loaders},
+                }
+            ]
+        ), patch.multiple(
+            views.HospitalizationsList,
+            template_name="rows.html",
+            table_paginate_by=None,
+        ):
+            expected = self.client.get(path).content.decode()
+            with patch.object(
+                views.HospitalizationsList, "table_streaming", True
+            ):
+                response = self.client.get(path)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertFalse(response.streaming)
+        self.assertIn("<tr", expected)
+        self.assertEqual(
+            self._normalize(response.content.decode()),
+            self._normalize(expected),
+        )
+
+    @staticmethod
+    def _normalize(content):
+        content = re.sub(r"[a-zA-Z0-9]{64}", "", content)  # csrf token
+        return re.sub(r"\s+", "", content)
+
+
+class HospitalizationSelectColumnsTests(AuthorizedUserTestCase):
+    """Тесты выборки только отображаемых в таблице столбцов"""
+
+    _headers = {"HTTP_HX-Request": "true"}
+
+    @parameterized.expand(
+        [
+            (
+                views.CurrentHospitalizationsList,
+                "hospitalizations:current",
+                {},
+            ),
+            (
+                views.HospitalizationsList,
+                "hospitalizations:hospitalizations",
+                {"pk": 4},
+            ),
+        ]
+    )
+    def test_select_columns_ok(self, view, viewname, kwargs):
+        """Тест отсутствия неотображаемых столбцов в запросе таблицы"""
+        path = reverse(viewname, kwargs=kwargs)
+        with patch.multiple(
+            view, table_select_columns=False, table_cache=False
+        ):
+            expected = self.client.get(path, **self._headers).getvalue()
+
+        with patch.object(view, "table_cache", False), CaptureQueriesContext(
+            connection
+        ) as queries:
+            response = self.client.get(path, **self._headers)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        sql = next(
+            query["sql"]
+            for query in queries.captured_queries
+            if '"hospitalizations_hospitalization"."entry_date"'
+            in query["sql"]
+        )
+        for column in (
+            "registration_address",
+            "residential_address",
+            "diagnosis",
+        ):
+            self.assertNotIn(column, sql)
+        self.assertEqual(
+            HospitalizationStreamingViewTests._normalize(
+                response.getvalue().decode()
+            ),
+            HospitalizationStreamingViewTests._normalize(expected.decode()),
+        )
+
+    def test_fio_annotation_ok(self):
+        """Тест совпадения ФИО из аннотации с конвертацией пациента"""
+        converter = FioConverter()
+        queryset = CurrentHospitalizationsTable.select_columns(
+            Hospitalization.current.all()
+        )
+        self.assertTrue(queryset)
+        for obj in queryset:
+            self.assertEqual(
+                obj.table_patient,
+                converter(Patient.objects.get(pk=obj.patient_id)),
+            )
+
+
+class HospitalizationPaginationViewTests(AuthorizedUserTestCase):
+    """Тесты постраничной подгрузки таблиц"""
+
+    _headers = {"HTTP_HX-Request": "true"}
+
+    @parameterized.expand(
+        [
+            (
+                views.CurrentHospitalizationsList,
+                "hospitalizations:current",
+                {},
+            ),
+            (
+                views.CurrentHospitalizationsList,
+                "hospitalizations:current",
+                {"order": "entry_date", "direction": "desc"},
+            ),
+            (
+                views.HospitalizationsList,
+                "hospitalizations:hospitalizations",
+                {"pk": 4},
+            ),
+        ]
+    )
+    def test_load_more_ok(self, view, viewname, kwargs):
+        """Тест совпадения подгруженных строк с полной таблицей"""
+        path = reverse(viewname, kwargs=kwargs)
+        with patch.object(view, "table_paginate_by", None):
+            content = self.client.get(path, **self._headers).getvalue()
+        expected = self._get_rows(content.decode())
+
+        with patch.object(view, "table_paginate_by", 1):
+            response = self.client.get(path, **self._headers)
+            content = response.getvalue().decode()
+            self.assertIn("<thead>", content)
+            rows = self._get_rows(content)
+            self.assertLessEqual(len(rows), 1)
+            while next_url := self._get_next_url(content):
+                response = self.client.get(next_url, **self._headers)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                content = response.content.decode()
+                self.assertNotIn("<thead>", content)
+                rows += self._get_rows(content)
+        self.assertEqual(rows, expected)
+
+    def test_load_more_invalid_cursor(self):
+        """Тест подгрузки строк с неверным курсором"""
+        path = reverse("hospitalizations:current")
+        response = self.client.get(path, {"after": "bad"}, **self._headers)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    @staticmethod
+    def _get_rows(content):
+        content = HospitalizationStreamingViewTests._normalize(content)
+        return re.findall(r"<tr><td.*?</tr>", content)
+
+    @staticmethod
+    def _get_next_url(content):
+        match = re.search(r'<tr hx-get="([^"]+)"', content)
+        return match and match.group(1).replace("&amp;", "&")
+
+
+class HospitalizationTableCacheViewTests(AuthorizedUserTestCase):
+    """Тесты кэширования таблицы находящихся на лечении"""
+
+    _headers = {"HTTP_HX-Request": "true"}
+
+    def _get(self, path, params=None):
+        response = self.client.get(path, params, **self._headers)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return response.content.decode()
+
+    def test_table_cache_hit(self):
+        """Тест отдачи таблицы из кэша без построения ячеек"""
+        path = reverse("hospitalizations:current")
+        with patch.object(
+            views.CurrentHospitalizationsList, "table_cache", False
+        ):
+            expected = self._get(path)
+        content = self._get(path)
+        with patch.object(
+            CurrentHospitalizationsTable, "get_body_rows"
+        ) as get_body_rows:
+            cached = self._get(path)
+        get_body_rows.assert_not_called()
+        normalize = HospitalizationStreamingViewTests._normalize
+        self.assertEqual(normalize(content), normalize(expected))
+        self.assertEqual(normalize(cached), normalize(expected))
+
+    def test_table_cache_invalidated(self):
+        """Тест обновления таблицы после изменения данных"""
+        path = reverse("hospitalizations:current")
+        content = self._get(path)
+        self.assertNotIn("новая заметка", content)
+
+        hospitalization = Hospitalization.current.first()
+        hospitalization.notes = "новая заметка"
+        hospitalization.save()
+        self.assertIn("новая заметка", self._get(path))
+
+        patient = hospitalization.patient
+        patient.patronymic = "Новоотчествович"
+        patient.save()
+        self.assertIn("Новоотчествович", self._get(path))
+
+        hospitalization.delete()
+        self.assertNotIn("новая заметка", self._get(path))
+
+    def test_table_cache_key_params(self):
+        """Тест раздельного кэширования для разных параметров запроса"""
+        path = reverse("hospitalizations:current")
+        self._get(path)
+        doctor = Hospitalization.current.first().doctor
+        with patch.object(
+            views.CurrentHospitalizationsList, "table_cache", False
+        ):
+            expected = self._get(path, {"selected_doctor": doctor.pk})
+        content = self._get(path, {"selected_doctor": doctor.pk})
+        normalize = HospitalizationStreamingViewTests._normalize
+        self.assertEqual(normalize(content), normalize(expected))
+
+
 class HospitalizationTemplateTests(AuthorizedUserTestCase):
     _headers = {"HTTP_HX-Request": "true"}
     _relay_url = "htmx/relay.html"
@@ -457,7 +763,7 @@ class HospitalizationTemplateTests(AuthorizedUserTestCase):
             reverse(viewname, kwargs=kwargs), **self._headers
         )
         self.assertTemplateNotUsed(response, self._relay_url)
-        content = response.content.decode()
+        content = response.getvalue().decode()
         for h in html:
             self.assertIn(h, content)
 
@@ -519,7 +825,7 @@ class HospitalizationTemplateTests(AuthorizedUserTestCase):
         response = self.client.get(
             reverse(viewname, kwargs=kwargs),
         )
-        content = response.content.decode()
+        content = response.getvalue().decode()
         for h in html:
             self.assertIn(h, content)
 
@@ -1001,6 +1307,374 @@ class HospitalizationFilesViewTests(AuthorizedUserTestCase):
                 self.assertEqual(response.content.decode(), "OK")
 
 
+class HospitalizationFileVersionTests(AuthorizedUserTestCase):
+    """Тесты версий данных для повторного использования файлов"""
+
+    @parameterized.expand(
+        [
+            (tasks.BuildCurrentDocxFileTask, {"selected_doctor": 0}),
+            (tasks.BuildCurrentXlsxFileTask, {"selected_doctor": 0}),
+            (tasks.BuildCurrentByDoctorsDocxFileTask, {}),
+        ]
+    )
+    def test_current_version_changed(self, task, task_kwargs):
+        """Тест изменения версии после изменения данных"""
+        version = task.get_data_version(**task_kwargs)
+        self.assertEqual(version, task.get_data_version(**task_kwargs))
+
+        hospitalization = Hospitalization.current.first()
+        hospitalization.notes = "новая заметка"
+        hospitalization.save()
+        changed = task.get_data_version(**task_kwargs)
+        self.assertNotEqual(version, changed)
+
+        hospitalization.patient.save()
+        self.assertNotEqual(changed, task.get_data_version(**task_kwargs))
+
+    @parameterized.expand(
+        [
+            (tasks.BuildCurrentDocxFileTask, {"selected_doctor": 0}),
+            (tasks.BuildCurrentXlsxFileTask, {"selected_doctor": 0}),
+            (tasks.BuildCurrentByDoctorsDocxFileTask, {}),
+            (tasks.BuildCurrentBundleFileTask, {"selected_doctor": 0}),
+            (tasks.BuildHistoryCsvFileTask, {}),
+        ]
+    )
+    def test_version_doctor_renamed(self, task, task_kwargs):
+        """Тест изменения версии после изменения ФИО врача"""
+        doctor = (
+            Hospitalization.current.filter(doctor__isnull=False).first().doctor
+        )
+        version = task.get_data_version(**task_kwargs)
+
+        doctor.last_name = "Изменено"
+        doctor.save()
+
+        self.assertNotEqual(version, task.get_data_version(**task_kwargs))
+
+    def test_one_version_changed(self):
+        """Тест изменения версии одной госпитализации"""
+        hospitalization = Hospitalization.objects.first()
+        version = tasks.BuildDocxFileTask.get_data_version(
+            pk=hospitalization.pk
+        )
+        self.assertEqual(version["count"], 1)
+        hospitalization.save()
+        self.assertNotEqual(
+            version,
+            tasks.BuildDocxFileTask.get_data_version(pk=hospitalization.pk),
+        )
+
+    @parameterized.expand(
+        [
+            (tasks.BuildDocxFileTask, "pk", "doctor", "last_name"),
+            (tasks.BuildDocxFileTask, "pk", "diagnosis", "icd_code"),
+            (tasks.BuildDocumentsZipFileTask, "pks", "doctor", "last_name"),
+            (tasks.BuildDocumentsZipFileTask, "pks", "diagnosis", "icd_code"),
+        ]
+    )
+    def test_documents_version_related_changed(
+        self, task, kwarg, related, field
+    ):
+        """Тест изменения версии документов после изменения врача или
+        диагноза"""
+        hospitalization = Hospitalization.objects.filter(
+            doctor__isnull=False
+        ).first()
+        hospitalization.diagnosis = Diagnosis.objects.create(
+            diagnosis="Диагноз", icd_code="F00"
+        )
+        hospitalization.save()
+        pk = hospitalization.pk
+        task_kwargs = {kwarg: pk if kwarg == "pk" else [pk]}
+        version = task.get_data_version(**task_kwargs)
+        self.assertEqual(version, task.get_data_version(**task_kwargs))
+
+        obj = getattr(hospitalization, related)
+        setattr(obj, field, "Изменено")
+        obj.save()
+
+        self.assertNotEqual(version, task.get_data_version(**task_kwargs))
+
+
+class HospitalizationDocumentContextTests(AuthorizedUserTestCase):
+    """Тесты контекста документов одной госпитализации"""
+
+    fixtures = AuthorizedUserTestCase.fixtures + [
+        "hospitalizations_diagnosis.json"
+    ]
+
+    def setUp(self):
+        super().setUp()
+        self.hospitalization = Hospitalization.objects.get(pk=1)
+        self.hospitalization.diagnosis = Diagnosis.objects.first()
+        self.hospitalization.save()
+        self.task = type(tasks.BuildDocxFileTask)()
+        self.task.pk = self.hospitalization.pk
+
+    def test_get_file_context_ok(self):
+        """Тест получения контекста одним запросом"""
+        with self.assertNumQueries(1):
+            obj = self.task.get_file_context()["obj"]
+
+        hospitalization = self.hospitalization
+        self.assertEqual(obj["entry_date"], hospitalization.entry_date)
+        self.assertEqual(obj["leaving_date"], hospitalization.leaving_date)
+        self.assertEqual(
+            obj["patient"]["surname"], hospitalization.patient.surname
+        )
+        self.assertEqual(
+            obj["patient"]["birthday"], hospitalization.patient.birthday
+        )
+        self.assertEqual(obj["doctor"], str(hospitalization.doctor))
+        self.assertEqual(
+            obj["diagnosis"],
+            {
+                "diagnosis": hospitalization.diagnosis.diagnosis,
+                "icd_code": hospitalization.diagnosis.icd_code,
+            },
+        )
+
+    def test_get_file_context_without_relations(self):
+        """Тест контекста госпитализации без врача и диагноза"""
+        self.hospitalization.doctor = None
+        self.hospitalization.diagnosis = None
+        self.hospitalization.save()
+        obj = self.task.get_file_context()["obj"]
+        self.assertIsNone(obj["doctor"])
+        self.assertIsNone(obj["diagnosis"])
+
+    @parameterized.expand([("docx/reference.docx",), ("docx/referral.docx",)])
+    def test_render_queries(self, template_file_path):
+        """Тест количества запросов при формировании документа"""
+        template = settings.MEDIA_ROOT / template_file_path
+        with tempfile.TemporaryDirectory() as directory:
+            with open(Path(directory) / "document.docx", "wb") as outfile:
+                with self.assertNumQueries(1):
+                    render_docx(
+                        template, self.task.get_file_context(), outfile
+                    )
+            with zipfile.ZipFile(outfile.name) as document:
+                text = document.read("word/document.xml").decode()
+        self.assertIn(self.hospitalization.patient.surname, text)
+        self.assertIn(self.hospitalization.diagnosis.icd_code, text)
+
+
+class HospitalizationDocumentsZipTests(AuthorizedUserTestCase):
+    """Тесты архива документов нескольких госпитализаций"""
+
+    def setUp(self):
+        super().setUp()
+        self.task = type(tasks.BuildDocumentsZipFileTask)()
+        self.task.pks = []
+        self.task.selected_doctor = 0
+
+    def _render(self, template_file_path):
+        template = settings.MEDIA_ROOT / template_file_path
+        with tempfile.TemporaryDirectory() as directory:
+            with open(Path(directory) / "documents.zip", "wb") as outfile:
+                with self.assertNumQueries(2):
+                    render_docx_zip(
+                        template, self.task.get_file_context(), outfile
+                    )
+            with zipfile.ZipFile(outfile.name) as archive:
+                return {
+                    name: zipfile.ZipFile(archive.open(name))
+                    .read("word/document.xml")
+                    .decode()
+                    for name in archive.namelist()
+                }
+
+    @parameterized.expand([("docx/reference.docx",), ("docx/referral.docx",)])
+    def test_render_current_ok(self, template_file_path):
+        """Тест формирования документов всех текущих госпитализаций"""
+        documents = self._render(template_file_path)
+
+        current = Hospitalization.current.select_related("patient")
+        self.assertEqual(len(documents), current.count())
+        for hospitalization in current:
+            patient = hospitalization.patient
+            name = f"{patient.surname}_{patient.name}_{patient.patronymic}"
+            text = documents[f"{name}_{hospitalization.pk}.docx"]
+            self.assertIn(patient.surname, text)
+
+    def test_render_pks_ok(self):
+        """Тест формирования документов выбранных госпитализаций"""
+        hospitalizations = Hospitalization.objects.order_by("pk")[:2]
+        self.task.pks = [
+            hospitalization.pk for hospitalization in hospitalizations
+        ]
+        documents = self._render("docx/reference.docx")
+        self.assertEqual(
+            sorted(int(name[:-5].rsplit("_", 1)[1]) for name in documents),
+            self.task.pks,
+        )
+
+    def test_data_version_changed(self):
+        """Тест изменения версии после изменения выбранных госпитализаций"""
+        hospitalization = Hospitalization.objects.first()
+        version = self.task.get_data_version(pks=[hospitalization.pk])
+        self.assertEqual(version["count"], 1)
+        hospitalization.save()
+        self.assertNotEqual(
+            version, self.task.get_data_version(pks=[hospitalization.pk])
+        )
+
+    @parameterized.expand(
+        [
+            (
+                "hospitalizations:create_current_references",
+                "docx/reference.docx",
+            ),
+            (
+                "hospitalizations:create_current_referrals",
+                "docx/referral.docx",
+            ),
+        ]
+    )
+    def test_create_view_ok(self, viewname, template_file_path):
+        """Тест создания задачи формирования архива"""
+        with patch.object(
+            file_downloader.views.CreateFileView, "get_task"
+        ) as get_task:
+            get_task.return_value.get_data_version.return_value = None
+            response = self.client.get(
+                reverse(viewname) + "?pk=2&pk=1&pk=2&pk=x&selected_doctor=1"
+            )
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        get_task.return_value.apply_async.assert_called_once_with(
+            (str(settings.MEDIA_ROOT / template_file_path), "zip"),
+            {"pks": [1, 2], "selected_doctor": 1},
+            task_id=response.context_data["task_id"],
+        )
+        self.assertEqual(
+            response.context_data["download_url"],
+            reverse(
+                "hospitalizations:download_zip",
+                args=[response.context_data["task_id"]],
+            ),
+        )
+
+
+class HospitalizationBundleViewTests(AuthorizedUserTestCase):
+    """Тесты архива списка текущих госпитализаций в нескольких форматах"""
+
+    @parameterized.expand(
+        [
+            ("", []),
+            ("&format=xlsx&format=pdf", ["xlsx"]),
+            ("&format=xlsx&format=docx", ["docx", "xlsx"]),
+        ]
+    )
+    def test_create_view_ok(self, query, formats):
+        """Тест создания задачи формирования архива"""
+        task = Mock(
+            bundle_renders=tasks.BuildCurrentBundleFileTask.bundle_renders
+        )
+        task.get_data_version.return_value = None
+        with patch.object(
+            views.CurrentHospitalizationsCreateBundleView, "task", task
+        ):
+            response = self.client.get(
+                reverse(
+                    "hospitalizations:create_current_bundle",
+                    args=["surname", "desc"],
+                )
+                + "?selected_doctor=1"
+                + query
+            )
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        task.apply_async.assert_called_once_with(
+            (str(settings.MEDIA_ROOT / "docx/list.docx"), "zip"),
+            {
+                "selected_doctor": 1,
+                "order": "surname",
+                "direction": "desc",
+                "formats": formats,
+            },
+            task_id=response.context_data["task_id"],
+        )
+        self.assertEqual(
+            response.context_data["download_url"],
+            reverse(
+                "hospitalizations:download_current_bundle",
+                args=[response.context_data["task_id"]],
+            ),
+        )
+
+
+class HospitalizationHistoryCsvTests(AuthorizedUserTestCase):
+    """Тесты выгрузки истории госпитализаций в csv"""
+
+    def _read(self, content):
+        return list(csv.reader(io.StringIO(content.decode("utf-8-sig"))))
+
+    def test_render_ok(self):
+        """Тест формирования csv со всеми госпитализациями"""
+        task = type(tasks.BuildHistoryCsvFileTask)()
+        template = settings.MEDIA_ROOT / "docx/history.csv"
+        with tempfile.TemporaryDirectory() as directory:
+            with open(Path(directory) / "history.csv", "wb") as outfile:
+                with self.assertNumQueries(2):
+                    render_csv(template, task.get_file_context(), outfile)
+            rows = self._read(Path(outfile.name).read_bytes())
+
+        self.assertEqual(rows[0][1], "Пациент")
+        self.assertEqual(len(rows), Hospitalization.objects.count() + 1)
+        hospitalization = Hospitalization.objects.order_by(
+            "patient__surname", "patient__name", "entry_date"
+        ).first()
+        self.assertEqual(rows[1][0], hospitalization.number)
+        self.assertEqual(
+            rows[1][2], hospitalization.patient.birthday.isoformat()
+        )
+
+    def test_streaming_view_ok(self):
+        """Тест потоковой отдачи госпитализаций одного пациента"""
+        patient = Hospitalization.objects.first().patient
+        response = self.client.get(
+            reverse("hospitalizations:hospitalizations_csv", args=[patient.pk])
+        )
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        rows = self._read(b"".join(response.streaming_content))
+        self.assertEqual(len(rows), patient.hospitalizations.count() + 1)
+        self.assertTrue(all(patient.surname in row[1] for row in rows[1:]))
+
+    def test_patient_view_not_found(self):
+        """Тест потоковой отдачи госпитализаций отсутствующего пациента"""
+        response = self.client.get(
+            reverse("hospitalizations:hospitalizations_csv", args=[999])
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_create_view_ok(self):
+        """Тест создания задачи формирования csv"""
+        with patch.object(
+            file_downloader.views.CreateFileView, "get_task"
+        ) as get_task:
+            get_task.return_value.get_data_version.return_value = None
+            response = self.client.get(
+                reverse("hospitalizations:create_history_csv")
+            )
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        get_task.return_value.apply_async.assert_called_once_with(
+            (str(settings.MEDIA_ROOT / "docx/history.csv"), "csv"),
+            {},
+            task_id=response.context_data["task_id"],
+        )
+        self.assertEqual(
+            response.context_data["download_url"],
+            reverse(
+                "hospitalizations:download_history_csv",
+                args=[response.context_data["task_id"]],
+            ),
+        )
+
+
 class HospitalizationFilesViewNonAuthorizedTests(TestCase):
     """Тесты представлений для создания и загрузки файлов,
     пользователь не авторизован"""
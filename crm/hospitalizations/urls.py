@@ -61,11 +61,46 @@ urlpatterns = [
         views.CurrentHospitalizationsCreateXlsxView.as_view(),
         name="create_current_xlsx",
     ),
+    path(
+        "current/<str:order>/<str:direction>/bundle",
+        views.CurrentHospitalizationsCreateBundleView.as_view(),
+        name="create_current_bundle",
+    ),
+    path(
+        "current/download/bundle/<str:task_id>/",
+        files_views.DownloadFileZipAuthorizedView.as_view(filename="list"),
+        name="download_current_bundle",
+    ),
+    path(
+        "history/csv",
+        views.HospitalizationsHistoryCreateCsvView.as_view(),
+        name="create_history_csv",
+    ),
+    path(
+        "history/download/csv/<str:task_id>/",
+        files_views.DownloadFileCsvAuthorizedView.as_view(filename="history"),
+        name="download_history_csv",
+    ),
+    path(
+        "<int:pk>/csv/",
+        views.PatientHospitalizationsCsvView.as_view(),
+        name="hospitalizations_csv",
+    ),
     path(
         "tasks/<str:task_id>/status/",
         files_views.TaskStatusAuthorizedView.as_view(),
         name="task_status",
     ),
+    path(
+        "tasks/<str:task_id>/events/",
+        files_views.TaskEventsAuthorizedView.as_view(),
+        name="task_events",
+    ),
+    path(
+        "tasks/metrics/",
+        files_views.OutputStoreMetricsAuthorizedView.as_view(),
+        name="files_metrics",
+    ),
     path(
         "current/download/docx/<str:task_id>/",
         files_views.DownloadFileDocxAuthorizedView.as_view(filename="list"),
@@ -91,6 +126,23 @@ urlpatterns = [
         files_views.DownloadFileDocxView.as_view(),
         name="download_docx",
     ),
+    path(
+        "documents/download/zip/<str:task_id>/",
+        files_views.DownloadFileZipAuthorizedView.as_view(
+            filename="documents"
+        ),
+        name="download_zip",
+    ),
+    path(
+        "current/references/zip",
+        views.CurrentReferencesCreateZipView.as_view(),
+        name="create_current_references",
+    ),
+    path(
+        "current/referrals/zip",
+        views.CurrentReferralsCreateZipView.as_view(),
+        name="create_current_referrals",
+    ),
     path(
         "documents/reference/<int:pk>/docx",
         views.CreateReferenceDocxView.as_view(),
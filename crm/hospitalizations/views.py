@@ -9,7 +9,12 @@ from django.views.generic import (
     UpdateView,
 )
 
-from file_downloader.views import CreateFileDocxView
+from file_downloader.views import (
+    CreateFileCsvView,
+    CreateFileDocxView,
+    CreateFileZipView,
+    StreamingCsvView,
+)
 from htmx.http import RenderPartial
 from patients import service as patient_service
 from tables.views import TableInlineFormView, TableRowView, TableView
@@ -34,6 +39,7 @@ class HospitalizationsList(LoginRequiredMixin, DataMixin, TableView, ListView):
     title_page = "Список госпитализаций"
     table_view_name = "hospitalizations:hospitalizations"
     table_schema = HospitalizationsTable
+    table_paginate_by = 50
 
     def get_queryset(self):
         return service.get_all(patient_pk=self.kwargs["pk"], **self.kwargs)
@@ -58,6 +64,9 @@ class CurrentHospitalizationsList(
     title_page = "Находящиеся на лечении"
     table_view_name = "hospitalizations:current"
     table_schema = CurrentHospitalizationsTable
+    table_paginate_by = 50
+    table_cache = True
+    table_cache_version_fields = ("time_update", "patient__time_update")
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -201,6 +210,52 @@ class CurrentHospitalizationsCreateXlsxView(
     task = tasks.BuildCurrentXlsxFileTask
 
 
+class CurrentHospitalizationsCreateBundleView(
+    CurrentHospitalizationsCreateDocxView
+):
+    """Archive of the list in the formats of the format parameters, in all
+    formats of the task without them"""
+
+    temp_file_extension = "zip"
+    download_url = "hospitalizations:download_current_bundle"
+    task = tasks.BuildCurrentBundleFileTask
+
+    def get_task_kwargs(self):
+        formats = self.request.GET.getlist("format")
+        return {
+            **super().get_task_kwargs(),
+            "formats": [
+                extension
+                for extension in self.task.bundle_renders
+                if extension in formats
+            ],
+        }
+
+
+class HospitalizationsHistoryCreateCsvView(
+    LoginRequiredMixin, RenderPartial, CreateFileCsvView
+):
+    template_file_path = "docx/history.csv"
+    download_url = "hospitalizations:download_history_csv"
+    task = tasks.BuildHistoryCsvFileTask
+
+
+class PatientHospitalizationsCsvView(LoginRequiredMixin, StreamingCsvView):
+    template_file_path = "docx/history.csv"
+    filename = "history"
+
+    def get(self, request, *args, **kwargs):
+        # Rows are read after the response is sent, so a missing patient
+        # is checked first
+        patient_service.get_one(self.kwargs["pk"])
+        return super().get(request, *args, **kwargs)
+
+    def get_rows(self):
+        return service.FileContent.get_history_rows(
+            patient_pk=self.kwargs["pk"]
+        ).iterator()
+
+
 class DocumentsView(LoginRequiredMixin, DataMixin, DetailView):
     model = Hospitalization
     template_name = "hospitalizations/documents.html"
@@ -213,6 +268,7 @@ class CreateDocumentDocxView(
 ):
     download_url = "hospitalizations:download_docx"
     task = tasks.BuildDocxFileTask
+    inline = True
 
     def get_context_data(self, **kwargs):
         self.task_kwargs = {
@@ -229,3 +285,30 @@ class CreateReferenceDocxView(CreateDocumentDocxView):
 class CreateReferralDocxView(CreateDocumentDocxView):
     template_file_path = "docx/referral.docx"
     filename = "Направление"
+
+
+class CurrentDocumentsCreateZipView(
+    LoginRequiredMixin, RenderPartial, CreateFileZipView
+):
+    """Archive of the documents of the hospitalizations selected by the pk
+    parameters, of the current ones of the selected doctor without them"""
+
+    download_url = "hospitalizations:download_zip"
+    task = tasks.BuildDocumentsZipFileTask
+
+    def get_context_data(self, **kwargs):
+        pks = self.request.GET.getlist("pk")
+        self.task_kwargs = {
+            "pks": sorted({int(pk) for pk in pks if pk.isdigit()}),
+            "selected_doctor": int(self.request.GET.get("selected_doctor", 0)),
+        }
+        context = super().get_context_data(**self.task_kwargs)
+        return context
+
+
+class CurrentReferencesCreateZipView(CurrentDocumentsCreateZipView):
+    template_file_path = "docx/reference.docx"
+
+
+class CurrentReferralsCreateZipView(CurrentDocumentsCreateZipView):
+    template_file_path = "docx/referral.docx"
@@ -54,24 +54,43 @@ function addEventListener(event_name, icon, title) {
 }
 
 
+function showDownloadLink() {
+    changeElementsStyle('waiting', 'display', 'none');
+    changeElementsStyle('finished', 'display', 'block');
+    changeElementsStyle('downloading_error', 'display', 'none');
+    document.body.dispatchEvent(new Event('"successMessage"'));
+}
+
+function showDownloadError() {
+    changeElementsStyle('waiting', 'display', 'none');
+    changeElementsStyle('finished', 'display', 'none');
+    changeElementsStyle('downloading_error', 'display', 'block');
+    document.body.dispatchEvent(new Event('"errorMessage"'));
+}
+
+function showProgress(response) {
+    const progress = response['progress'];
+    if (progress && progress['percent'] != null) {
+        cngElementsAtr('waiting_progress', 'textContent', ' ' + progress['percent'] + '%');
+    }
+}
+
 function pollForResult(url) {
     fetch(url).then(response => response.json())
               .then(response => {
                   if (response['task_status']) {
                         task_status = response['task_status']
                         if (task_status == 'SUCCESS') {
-                            changeElementsStyle('waiting', 'display', 'none');
-                            changeElementsStyle('finished', 'display', 'block');
-                            changeElementsStyle('downloading_error', 'display', 'none');
-                            document.body.dispatchEvent(new Event('"successMessage"'));
+                            showDownloadLink();
                         } else {
+                            showProgress(response);
                             if (counter >= 5){
-                                changeElementsStyle('waiting', 'display', 'none');
-                                changeElementsStyle('finished', 'display', 'none');
-                                changeElementsStyle('downloading_error', 'display', 'block');
-                                document.body.dispatchEvent(new Event('"errorMessage"'));
+                                showDownloadError();
                             } else {
-                                counter += 1
+                                // A task reporting progress is not stuck
+                                if (task_status != 'PROGRESS') {
+                                    counter += 1
+                                }
                                 setTimeout(function(){
                                     pollForResult(url);
                                 }, 3000);
@@ -81,6 +100,57 @@ function pollForResult(url) {
     })
 }
 
+// Waiting gives up if the task reports no progress for this long
+const resultTimeout = 30000;
+
+function waitForResult(eventsUrl, statusUrl) {
+    if (typeof EventSource === 'undefined') {
+        pollForResult(statusUrl);
+        return;
+    }
+    const source = new EventSource(eventsUrl);
+    let lastProgress = null;
+    let timer = null;
+    const stop = () => {
+        clearTimeout(timer);
+        source.close();
+    };
+    const restartTimer = () => {
+        clearTimeout(timer);
+        timer = setTimeout(() => {
+            stop();
+            showDownloadError();
+        }, resultTimeout);
+    };
+    restartTimer();
+    source.onmessage = (event) => {
+        const response = JSON.parse(event.data);
+        const task_status = response['task_status'];
+        showProgress(response);
+        if (task_status == 'SUCCESS') {
+            stop();
+            showDownloadLink();
+        } else if (task_status == 'FAILURE' || task_status == 'REVOKED') {
+            stop();
+            showDownloadError();
+        } else if (task_status == 'PROGRESS') {
+            // A task reporting progress is not stuck
+            const progress = JSON.stringify(response['progress']);
+            if (progress != lastProgress) {
+                lastProgress = progress;
+                restartTimer();
+            }
+        }
+    };
+    source.onerror = () => {
+        // The browser reconnects by itself unless the stream is closed
+        if (source.readyState == EventSource.CLOSED) {
+            stop();
+            showDownloadError();
+        }
+    };
+}
+
 
 addEventListener('"successMessage"', 'success', 'Успешно')
 addEventListener('"errorMessage"', 'warning', 'Ошибка')
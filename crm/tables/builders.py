@@ -1,7 +1,10 @@
 from abc import ABC, abstractmethod
-from typing import Callable, Union
+from functools import lru_cache
+from typing import Any, Callable, Optional, Union
+from urllib.parse import urlencode
 
-from django.urls import reverse
+from django.http import QueryDict
+from django.urls import get_script_prefix, get_urlconf, reverse
 
 from tables.buttons import Button
 from tables.cells import Cell, TableBodyCell, TableButtonsCell, TableHeaderCell
@@ -13,38 +16,59 @@ class CellBuilder(ABC):
         pass
 
 
+@lru_cache(maxsize=1024)
+def get_sorting_urls(
+    view_name: str,
+    name: str,
+    kwargs: tuple[tuple[str, Any], ...],
+    params: tuple[tuple[str, Any], ...],
+    urlconf: Optional[str] = None,
+    prefix: str = "",
+) -> tuple[str, str]:
+    """Ascending and descending sorting urls of a header, cached per view,
+    field, kwargs without the order and request params.
+    urlconf and prefix only take part in the cache key"""
+    query = f"?{urlencode(params, doseq=True)}" if params else ""
+    return tuple(
+        reverse(
+            viewname=view_name,
+            urlconf=urlconf,
+            kwargs={"order": name, "direction": direction, **dict(kwargs)},
+        )
+        + query
+        for direction in ("asc", "desc")
+    )
+
+
 class TableHeaderCellBuilder(CellBuilder):
-    @classmethod
-    def __raw_params(cls, request_params: dict) -> str:
-        return "&".join([f"{k}={v}" for k, v in request_params.items()])
+    @staticmethod
+    def __freeze_params(request_params) -> tuple[tuple[str, Any], ...]:
+        if isinstance(request_params, QueryDict):
+            return tuple(
+                (key, tuple(values)) for key, values in request_params.lists()
+            )
+        return tuple(request_params.items())
 
     @classmethod
-    def __reverse(
-        cls,
-        direction: str,
-        kwargs: dict,
-    ) -> str:
+    def __get_sorting_urls(cls, kwargs: dict) -> tuple[str, str]:
         params = kwargs["_request_kwargs"].copy()
         if "order" in params:
             params.pop("order")
             params.pop("direction")
-        url = reverse(
-            viewname=kwargs.get("_view_name_th"),
-            kwargs={
-                "order": kwargs.get("_name"),
-                "direction": direction,
-                **params,
-            },
+        return get_sorting_urls(
+            kwargs.get("_view_name_th"),
+            kwargs.get("_name"),
+            tuple(params.items()),
+            cls.__freeze_params(kwargs.get("_request_params") or {}),
+            get_urlconf(),
+            get_script_prefix(),
         )
 
-        if "_request_params" in kwargs and kwargs["_request_params"]:
-            url += f"?{cls.__raw_params(kwargs.get('_request_params'))}"
-
-        return url
-
     def __add_sorting_url(self, kwargs) -> None:
-        kwargs["_asc_sorting_url"] = self.__reverse("asc", kwargs)
-        kwargs["_desc_sorting_url"] = self.__reverse("desc", kwargs)
+        (
+            kwargs["_asc_sorting_url"],
+            kwargs["_desc_sorting_url"],
+        ) = self.__get_sorting_urls(kwargs)
 
     def __call__(self, **kwargs) -> TableHeaderCell:
         if "_view_name_th" in kwargs and kwargs["_view_name_th"]:
@@ -63,8 +87,13 @@ class TableBodyCellBuilder(CellBuilder):
         )
 
     def _add_url(self, kwargs: dict) -> None:
+        url_templates = kwargs.pop("_url_templates", None)
         if "_view_name_td" in kwargs and kwargs["_view_name_td"]:
-            kwargs["_url"] = self.__reverse(kwargs)
+            if url_templates is None:
+                kwargs["_url"] = self.__reverse(kwargs)
+            else:
+                url_template = url_templates[kwargs["_view_name_td"]]
+                kwargs["_url"] = url_template(kwargs.get("pk"))
 
     @classmethod
     def _add_default_value(cls, kwargs: dict) -> None:
@@ -84,13 +113,16 @@ class ObjectFactory:
     def register_builder(self, key: str, builder: Callable[..., Cell]):
         self._builders[key] = builder
 
-    def create(
-        self, key: str, **kwargs
-    ) -> Union[TableBodyCell, TableHeaderCell]:
+    def get_builder(self, key: str) -> Callable[..., Cell]:
         builder = self._builders.get(key)
         if not builder:
             raise ValueError(f"Unknown type of builder {key}")
-        return builder(**kwargs)
+        return builder
+
+    def create(
+        self, key: str, **kwargs
+    ) -> Union[TableBodyCell, TableHeaderCell]:
+        return self.get_builder(key)(**kwargs)
 
 
 class TableButtonsCellBuilder(CellBuilder):
@@ -103,8 +135,13 @@ class TableButtonsCellBuilder(CellBuilder):
 
     def __add_buttons(self, kwargs: dict) -> None:
         buttons = self._check_buttons(kwargs)
-        for i in range(len(buttons)):
-            buttons[i] = buttons[i].clone(pk=kwargs.get("pk"))
+        url_templates = kwargs.pop("_url_templates", None)
+        pk = kwargs.get("pk")
+        for i, button in enumerate(buttons):
+            url_template = None
+            if url_templates is not None and button.view_name:
+                url_template = url_templates[button.view_name]
+            buttons[i] = button.bind(pk, url_template)
         kwargs["buttons"] = buttons
 
     def __call__(self, **kwargs) -> TableButtonsCell:
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
-import copy
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Callable, Optional
+
+from django.urls import reverse
 
 
 class Button(ABC):
@@ -33,9 +34,16 @@ class Button(ABC):
     def view_name(self):
         pass
 
-    @abstractmethod
-    def clone(self, pk: int) -> Button:
-        pass
+    def bind(
+        self, pk: int, url_template: Optional[Callable[[int], str]] = None
+    ) -> BoundButton:
+        if url_template:
+            url = url_template(pk)
+        elif self.view_name:
+            url = reverse(self.view_name, args=[pk])
+        else:
+            url = self.url
+        return BoundButton(self, pk, url)
 
 
 class BaseButton(Button):
@@ -50,10 +58,9 @@ class BaseButton(Button):
         self.__name = name
         self.__pk = pk
         self.__view_name = view_name
+        self.__url = url
         if template_name:
             self.__template_name = template_name
-        if url:
-            self.__url = url
 
     @property
     def pk(self):
@@ -75,10 +82,21 @@ class BaseButton(Button):
     def view_name(self):
         return self.__view_name
 
-    def clone(self, pk: int) -> Button:
-        button = copy.deepcopy(self)
-        button.pk = pk
-        return button
+
+class BoundButton:
+    """Per-row view of a button shared by all rows of a table"""
+
+    __slots__ = ("button", "pk", "url")
+
+    def __init__(self, button: Button, pk: int, url: Optional[str]) -> None:
+        self.button = button
+        self.pk = pk
+        self.url = url
+
+    def __getattr__(self, item):
+        if item in self.__slots__:
+            raise AttributeError(item)
+        return getattr(self.button, item)
 
 
 class ConfirmButton(BaseButton):
@@ -0,0 +1,63 @@
+import hashlib
+from typing import Any, Callable, Iterable, Optional
+
+from django.core.cache import caches
+from django.db.models import Count, Max, QuerySet
+from django.db.models.constants import LOOKUP_SEP
+
+
+def get_queryset_version(
+    queryset: QuerySet, fields: Iterable[str]
+) -> tuple[Any, ...]:
+    """Cheap version of the rows of a queryset - the latest change of
+    every field and the number of rows"""
+    aggregates = {f"version_{i}": Max(field) for i, field in enumerate(fields)}
+    result = queryset.order_by().aggregate(
+        version_count=Count("pk"), **aggregates
+    )
+    return tuple(result[key] for key in sorted(result))
+
+
+def get_object_version(obj: Any, fields: Iterable[str]) -> tuple[Any, ...]:
+    version = []
+    for field in fields:
+        value = obj
+        for name in field.split(LOOKUP_SEP):
+            value = getattr(value, name, None)
+        version.append(value)
+    return tuple(version)
+
+
+class TableCache:
+    """Rendered table fragments stored in a cache backend"""
+
+    prefix = "tables"
+
+    def __init__(
+        self, alias: str = "default", timeout: Optional[int] = None
+    ) -> None:
+        self.__cache = caches[alias]
+        self.__timeout = timeout
+
+    @property
+    def timeout(self) -> Optional[int]:
+        return self.__timeout
+
+    def make_key(self, schema: type, *parts: Any) -> str:
+        digest = hashlib.md5(repr(parts).encode()).hexdigest()
+        return (
+            f"{self.prefix}:{schema.__module__}.{schema.__qualname__}:{digest}"
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        return self.__cache.get(key)
+
+    def set(self, key: str, html: str) -> None:
+        self.__cache.set(key, html, self.__timeout)
+
+    def get_or_render(self, key: str, render: Callable[[], str]) -> str:
+        html = self.get(key)
+        if html is None:
+            html = render()
+            self.set(key, html)
+        return html
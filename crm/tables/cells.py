@@ -1,15 +1,31 @@
 from abc import ABC
-from typing import Optional, Union
+from typing import Iterable, Optional, Union
 
 from tables.buttons import Button
 from tables.html import HTMLAttributes
 
 
 class Cell(ABC):
-    pass
+    __slots__ = ()
 
 
 class BaseCell(Cell):
+    __slots__ = ("_visible",)
+    _dict_keys = (("_visible", "visible"),)
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        slots = [
+            slot
+            for klass in reversed(cls.__mro__)
+            for slot in getattr(klass, "__slots__", ())
+        ]
+        cls._dict_keys = tuple(
+            (slot, slot.removeprefix("_"))
+            for slot in slots
+            if "__" not in slot
+        )
+
     def __init__(self, _visible: bool = True, **kwargs) -> None:
         self._visible = _visible
 
@@ -18,16 +34,18 @@ class BaseCell(Cell):
         return self._visible
 
     def to_dict(self):
-        res = {}
-        for key, value in vars(self).items():
-            if "__" not in key:
-                if key.startswith("_"):
-                    key = key[1:]
-                res[key] = value
-        return res
+        return {key: getattr(self, slot) for slot, key in self._dict_keys}
 
 
 class TableHeaderCell(BaseCell):
+    __slots__ = (
+        "_name",
+        "_sorting_field",
+        "_attrs",
+        "_asc_sorting_url",
+        "_desc_sorting_url",
+    )
+
     def __init__(
         self,
         _name: str,
@@ -35,7 +53,7 @@ class TableHeaderCell(BaseCell):
         _attrs_th: Optional[HTMLAttributes] = None,
         _asc_sorting_url: Optional[str] = None,
         _desc_sorting_url: Optional[str] = None,
-        **kwargs
+        **kwargs,
     ) -> None:
         self._name = _verbose_name or _name.title()
         self._sorting_field = _name
@@ -69,13 +87,15 @@ class TableHeaderCell(BaseCell):
 
 
 class TableBodyCell(BaseCell):
+    __slots__ = ("_attrs", "_pk", "_url", "value")
+
     def __init__(
         self,
         pk: Optional[int] = None,
         value: str = "",
         _url: Optional[str] = None,
         _attrs_td: Optional[HTMLAttributes] = None,
-        **kwargs
+        **kwargs,
     ) -> None:
         super().__init__(**kwargs)
         self._attrs = _attrs_td
@@ -98,6 +118,7 @@ class Table:
         self.__table_id = table_id
         self.__header = []
         self.__body_rows = []
+        self.__streaming = False
 
     @classmethod
     def __validate_table_id(cls, table_id: str) -> None:
@@ -118,10 +139,26 @@ class Table:
         return self.__body_rows
 
     def add_body_row(self, row: Union[list, tuple]) -> None:
+        if self.__streaming:
+            raise TypeError("Unable to add a row to a streaming table")
         if type(row) not in [list, tuple]:
             raise TypeError("Expected list or tuple type for body row")
         self.__body_rows.append(row)
 
+    def stream_body_rows(self, rows: Iterable[list[TableBodyCell]]) -> None:
+        if self.__body_rows:
+            raise TypeError("Table already contains body rows")
+        self.__body_rows = rows
+        self.__streaming = True
+
+    @property
+    def streaming(self) -> bool:
+        return self.__streaming
+
+    @property
+    def rows_marker(self) -> str:
+        return f"<!-- table-rows-{id(self)} -->"
+
     @property
     def table_id(self) -> str:
         return self.__table_id
@@ -133,6 +170,7 @@ class Table:
 
 
 class TableButtonsCell(BaseCell):
+    __slots__ = ("_pk", "buttons", "_attrs")
     cell_type = "buttons"
 
     def __init__(
@@ -141,7 +179,7 @@ class TableButtonsCell(BaseCell):
         pk: int,
         buttons: list[Button],
         _attrs_td: Optional[HTMLAttributes] = None,
-        **kwargs
+        **kwargs,
     ) -> None:
         super().__init__(**kwargs)
         if not pk or type(pk) is not int:
@@ -1,9 +1,14 @@
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, Iterable, Optional
+
+from django.db.models import Expression
 
 
 class Converter(ABC):
     message = "Error while converting data - {}"
+    # Attributes of the converted value the converter reads, used to narrow
+    # the columns selected for a table. Empty means the value itself.
+    lookups: tuple[str, ...] = ()
 
     def __init__(self, message: str = "") -> None:
         if message:
@@ -13,6 +18,18 @@ class Converter(ABC):
     def convert(self, value: Any) -> Any:
         pass
 
+    def convert_many(self, values: list) -> list:
+        try:
+            return [self.convert(value) for value in values]
+        except Exception:
+            # Convert one by one to report the value that failed
+            return [self(value) for value in values]
+
+    def annotate(self, name: str) -> Optional[Expression]:
+        """Expression to compute the converted value of column "name" in
+        the database, read by the converter instead of the attribute"""
+        return None
+
     def __call__(self, value: Any, *args, **kwargs) -> Any:
         try:
             return self.convert(value)
@@ -28,7 +45,44 @@ class CellContentConverter:
         if converters is not None:
             self._converters += converters
 
+    @property
+    def lookups(self) -> tuple[str, ...]:
+        lookups = []
+        for converter in self._converters:
+            for lookup in getattr(converter, "lookups", ()):
+                if lookup not in lookups:
+                    lookups.append(lookup)
+        return tuple(lookups)
+
     def convert(self, value: Any) -> Any:
         for converter in self._converters:
             value = converter(value)
         return value
+
+    def convert_many(self, values: Iterable, annotated: bool = False) -> list:
+        """Converted values, annotated values are computed by annotate() and
+        skip the converter that supplied the annotation"""
+        converters = self._converters[1:] if annotated else self._converters
+        values = list(values)
+        try:
+            # Repeated values of a column are converted once
+            keys = [(type(value), value) for value in values]
+            unique = dict.fromkeys(keys)
+        except TypeError:
+            return self.__convert_many(converters, values)
+        converted = self.__convert_many(
+            converters, [value for _, value in unique]
+        )
+        unique = dict(zip(unique, converted))
+        return [unique[key] for key in keys]
+
+    @staticmethod
+    def __convert_many(converters: list[Converter], values: list) -> list:
+        for converter in converters:
+            values = converter.convert_many(values)
+        return values
+
+    def annotate(self, name: str) -> Optional[Expression]:
+        if self._converters:
+            return self._converters[0].annotate(name)
+        return None
@@ -0,0 +1,188 @@
+import datetime
+import gc
+import json
+import platform
+import time
+import tracemalloc
+import zoneinfo
+from pathlib import Path
+from typing import Callable
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.template import loader
+
+from hospitalizations.models import Hospitalization
+from hospitalizations.tables import (
+    CurrentHospitalizationsTable,
+    HospitalizationsTable,
+)
+from patients.models import Patient
+from tables.schemas import Column
+
+SURNAMES = ("Иванов", "Петров", "Сидоров", "Смирнов", "Кузнецов", "Попов")
+NAMES = ("Иван", "Пётр", "Сергей", "Алексей", "Николай", "Михаил")
+PATRONYMICS = ("Иванович", "Петрович", "Сергеевич", "Алексеевич", "")
+
+TABLES = {
+    "current": (
+        CurrentHospitalizationsTable,
+        "hospitalizations:current",
+        {},
+    ),
+    "hospitalizations": (
+        HospitalizationsTable,
+        "hospitalizations:hospitalizations",
+        {"pk": 1},
+    ),
+}
+
+
+def make_dataset(size: int) -> list[Hospitalization]:
+    """Unsaved hospitalizations shaped like TableSchema.select_columns()
+    output, including the FIO annotation"""
+    tz = zoneinfo.ZoneInfo(settings.TIME_ZONE)
+    start = datetime.datetime(2020, 1, 1, 9, tzinfo=tz)
+    objects = []
+    for i in range(1, size + 1):
+        patient = Patient(
+            pk=i,
+            surname=SURNAMES[i % len(SURNAMES)],
+            name=NAMES[i % len(NAMES)],
+            patronymic=PATRONYMICS[i % len(PATRONYMICS)],
+            birthday=datetime.date(1940 + i % 60, 1 + i % 12, 1 + i % 28),
+        )
+        entry_date = start + datetime.timedelta(hours=i)
+        hospitalization = Hospitalization(
+            pk=i,
+            patient=patient,
+            entry_date=entry_date,
+            leaving_date=(
+                entry_date + datetime.timedelta(days=14) if i % 3 else None
+            ),
+            notes=f"Заметка {i}" if i % 4 else "",
+        )
+        setattr(
+            hospitalization,
+            f"{Column.annotation_prefix}patient",
+            f"{patient.surname} {patient.name} {patient.patronymic}",
+        )
+        objects.append(hospitalization)
+    return objects
+
+
+def measure(func: Callable, repeat: int) -> dict:
+    gc.collect()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = func()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    # Memory and blocks still allocated by the result of the operation
+    statistics = snapshot.statistics("filename")
+    return {
+        "seconds": min(timings),
+        "peak_memory": peak,
+        "allocated_memory": sum(stat.size for stat in statistics),
+        "allocations": sum(stat.count for stat in statistics),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark make_table, get_body_row and template rendering of the "
+        "hospitalization tables on synthetic datasets"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            nargs="+",
+            type=int,
+            default=[100, 1000, 10000, 100000],
+        )
+        parser.add_argument(
+            "--tables", nargs="+", choices=TABLES, default=list(TABLES)
+        )
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument(
+            "--output",
+            default="tables_benchmark.json",
+            help="JSON file with the results",
+        )
+        parser.add_argument(
+            "--label", default="", help="Name of the run, e.g. a commit"
+        )
+
+    def handle(self, *args, **options):
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be a positive integer")
+        results = []
+        for size in options["sizes"]:
+            dataset = make_dataset(size)
+            for name in options["tables"]:
+                for operation, func in self.get_operations(name, dataset):
+                    result = measure(func, options["repeat"])
+                    result.update(table=name, operation=operation, rows=size)
+                    result["rows_per_sec"] = size / result["seconds"]
+                    results.append(result)
+                    self.stdout.write(
+                        "{table:<16} {operation:<12} {rows:>7} rows "
+                        "{seconds:>9.4f} s {rows_per_sec:>11.0f} rows/s "
+                        "peak {peak_memory:>11} B "
+                        "{allocations:>8} blocks".format(**result)
+                    )
+
+        output = Path(options["output"])
+        output.write_text(
+            json.dumps(
+                {
+                    "label": options["label"],
+                    "created": datetime.datetime.now().isoformat(),
+                    "python": platform.python_version(),
+                    "django": django.get_version(),
+                    "results": results,
+                },
+                ensure_ascii=False,
+                indent=2,
+            )
+        )
+        self.stdout.write(self.style.SUCCESS(f"Results saved to {output}"))
+
+    @staticmethod
+    def get_operations(name: str, dataset: list):
+        schema, view_name, kwargs = TABLES[name]
+
+        def get_table():
+            return schema(view_name=view_name, request_kwargs=dict(kwargs))
+
+        def make_table():
+            return get_table().make_table(dataset)
+
+        def get_body_row():
+            table = get_table()
+            return [table.get_body_row(obj) for obj in dataset]
+
+        table = make_table()
+
+        def render():
+            return loader.render_to_string(
+                "tables/table.html", {"table": table}
+            )
+
+        return (
+            ("make_table", make_table),
+            ("get_body_row", get_body_row),
+            ("render", render),
+        )
@@ -0,0 +1,146 @@
+from typing import Any, Optional
+
+from django.core import signing
+from django.db.models import F, Q, QuerySet
+from django.db.models.constants import LOOKUP_SEP
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPage:
+    def __init__(self, objects: list, next_cursor: Optional[str]) -> None:
+        self.__objects = objects
+        self.__next_cursor = next_cursor
+
+    @property
+    def objects(self) -> list:
+        return self.__objects
+
+    @property
+    def next_cursor(self) -> Optional[str]:
+        return self.__next_cursor
+
+    @property
+    def has_next(self) -> bool:
+        return self.__next_cursor is not None
+
+
+class KeysetPaginator:
+    """Seek pagination on the first ordering field of a queryset and pk
+
+    Every page is a single indexed range query, so page N costs the same
+    as the first one. NULLs are sorted last for ascending and first for
+    descending order, as PostgreSQL does by default.
+    """
+
+    salt = "tables.pagination"
+    annotation = "keyset_value"
+
+    def __init__(self, queryset: QuerySet, per_page: int) -> None:
+        if per_page < 1:
+            raise ValueError("'per_page' must be a positive integer")
+        self.__per_page = per_page
+        self.__model = queryset.model
+        self.__lookup, self.__descending = self.__get_sort_key(queryset)
+        self.__field = self.__resolve_field(self.__lookup)
+        if self.__lookup != "pk":
+            queryset = queryset.annotate(**{self.annotation: F(self.__lookup)})
+        self.__queryset = queryset.order_by(*self.__get_ordering())
+
+    @property
+    def per_page(self) -> int:
+        return self.__per_page
+
+    @property
+    def lookup(self) -> str:
+        return self.__lookup
+
+    @property
+    def descending(self) -> bool:
+        return self.__descending
+
+    def __get_sort_key(self, queryset: QuerySet) -> tuple[str, bool]:
+        ordering = queryset.query.order_by or self.__model._meta.ordering
+        if not ordering or not isinstance(ordering[0], str):
+            return "pk", False
+        descending = ordering[0].startswith("-")
+        lookup = ordering[0].removeprefix("-")
+        if lookup == self.__model._meta.pk.name:
+            return "pk", descending
+        # Ordering by a relation sorts by the related model's ordering
+        field = self.__resolve_field(lookup)
+        while field.is_relation:
+            related = field.related_model._meta.ordering
+            if not related or not isinstance(related[0], str):
+                return f"{lookup}{LOOKUP_SEP}pk", descending
+            if related[0].startswith("-"):
+                descending = not descending
+            lookup = f"{lookup}{LOOKUP_SEP}{related[0].removeprefix('-')}"
+            field = self.__resolve_field(lookup)
+        return lookup, descending
+
+    def __resolve_field(self, lookup: str):
+        model, field = self.__model, self.__model._meta.pk
+        for name in lookup.split(LOOKUP_SEP):
+            if name == "pk":
+                field = model._meta.pk
+            else:
+                field = model._meta.get_field(name)
+            model = field.related_model or model
+        return field
+
+    def __get_ordering(self) -> tuple:
+        if self.__lookup == "pk":
+            return ("-pk",) if self.__descending else ("pk",)
+        if self.__descending:
+            return F(self.__lookup).desc(nulls_first=True), "-pk"
+        return F(self.__lookup).asc(nulls_last=True), "pk"
+
+    def __seek(self, value: Any, pk: Any) -> Q:
+        if self.__lookup == "pk":
+            return Q(pk__lt=pk) if self.__descending else Q(pk__gt=pk)
+        lookup, isnull = self.__lookup, f"{self.__lookup}__isnull"
+        if self.__descending:
+            if value is None:
+                return Q(**{isnull: True, "pk__lt": pk}) | Q(**{isnull: False})
+            return Q(**{f"{lookup}__lt": value}) | Q(
+                **{lookup: value, "pk__lt": pk}
+            )
+        if value is None:
+            return Q(**{isnull: True, "pk__gt": pk})
+        return (
+            Q(**{f"{lookup}__gt": value})
+            | Q(**{lookup: value, "pk__gt": pk})
+            | Q(**{isnull: True})
+        )
+
+    def encode_cursor(self, obj: Any) -> str:
+        value = getattr(obj, self.annotation, obj.pk)
+        if value is not None and self.__lookup != "pk":
+            value = str(value)
+        return signing.dumps([self.__lookup, value, obj.pk], salt=self.salt)
+
+    def decode_cursor(self, cursor: str) -> tuple[Any, Any]:
+        try:
+            lookup, value, pk = signing.loads(cursor, salt=self.salt)
+        except (signing.BadSignature, TypeError, ValueError) as ex:
+            raise InvalidCursor(f"Invalid cursor - {ex}")
+        if lookup != self.__lookup:
+            raise InvalidCursor("The cursor belongs to another ordering")
+        if value is not None and self.__lookup != "pk":
+            value = self.__field.to_python(value)
+        return value, pk
+
+    def get_page(self, cursor: Optional[str] = None) -> KeysetPage:
+        queryset = self.__queryset
+        if cursor:
+            queryset = queryset.filter(
+                self.__seek(*self.decode_cursor(cursor))
+            )
+        objects = list(queryset[: self.__per_page + 1])
+        if len(objects) <= self.__per_page:
+            return KeysetPage(objects, None)
+        objects = objects[: self.__per_page]
+        return KeysetPage(objects, self.encode_cursor(objects[-1]))
@@ -1,16 +1,159 @@
-from typing import Optional, Union
+from functools import partial
+from itertools import islice
+from types import MappingProxyType
+from typing import Any, Iterable, Iterator, Optional, Sequence, Union
 
+from django.core.exceptions import FieldDoesNotExist
 from django.db.models import QuerySet
+from django.db.models.constants import LOOKUP_SEP
 from django.http import QueryDict
 
 from tables import factory
-from tables.cells import Table, TableBodyCell, TableHeaderCell
+from tables.cells import Cell, Table, TableBodyCell, TableHeaderCell
 from tables.converters import CellContentConverter
 from tables.fields import ButtonsField, Field
+from tables.url_templates import UrlTemplates
+
+_missing = object()
+
+
+class Column:
+    """Column of a table schema, compiled once per schema class"""
+
+    annotation_prefix = "table_"
+
+    __slots__ = (
+        "name",
+        "field",
+        "kwargs",
+        "is_buttons",
+        "converter",
+        "lookups",
+        "annotation",
+        "source",
+        "build",
+    )
+
+    def __init__(self, name: str, field: Field) -> None:
+        if not field.name:
+            field.name = name
+        self.name = name
+        self.field = field
+        self.is_buttons = isinstance(field, ButtonsField)
+        kwargs = dict(field.to_dict())
+        if self.is_buttons:
+            kwargs["buttons"] = field.buttons
+        self.kwargs = MappingProxyType(kwargs)
+        self.converter = (
+            CellContentConverter(field.converters)
+            if field.converters
+            else None
+        )
+        self.annotation = (
+            self.converter.annotate(name) if self.converter else None
+        )
+        self.source = f"{self.annotation_prefix}{name}"
+        self.lookups = self._get_lookups()
+        builder = factory.get_builder(
+            "buttons_cell" if self.is_buttons else "body_cell"
+        )
+        self.build = partial(builder, **kwargs)
+
+    def _get_lookups(self) -> tuple[str, ...]:
+        if self.is_buttons or self.annotation is not None:
+            return ()
+        if self.converter and self.converter.lookups:
+            return tuple(
+                f"{self.name}__{lookup}" for lookup in self.converter.lookups
+            )
+        return (self.name,)
+
+    def get_value(self, obj: Any) -> Any:
+        return self.get_values((obj,))[0]
+
+    def get_values(self, objects: Sequence) -> list:
+        if not self.converter:
+            return [getattr(obj, self.name) for obj in objects]
+        annotated = {}
+        if self.annotation is not None:
+            for i, obj in enumerate(objects):
+                value = getattr(obj, self.source, _missing)
+                if value is not _missing:
+                    annotated[i] = value
+        if len(annotated) == len(objects):
+            return self.converter.convert_many(
+                annotated.values(), annotated=True
+            )
+        values = self.converter.convert_many(
+            getattr(obj, self.name)
+            for i, obj in enumerate(objects)
+            if i not in annotated
+        )
+        if not annotated:
+            return values
+        # Objects fetched without the annotation are converted from the
+        # attribute by the whole chain
+        converted = dict(
+            zip(
+                annotated,
+                self.converter.convert_many(
+                    annotated.values(), annotated=True
+                ),
+            )
+        )
+        values = iter(values)
+        return [
+            converted[i] if i in converted else next(values)
+            for i in range(len(objects))
+        ]
+
+    def make_cell(
+        self,
+        pk: Optional[int],
+        obj: Any,
+        url_templates: Optional[UrlTemplates] = None,
+    ) -> Cell:
+        return self.make_cells((pk,), (obj,), url_templates)[0]
+
+    def make_cells(
+        self,
+        pks: Sequence[Optional[int]],
+        objects: Sequence,
+        url_templates: Optional[UrlTemplates] = None,
+    ) -> list[Cell]:
+        build = self.build
+        if self.is_buttons:
+            return [build(pk=pk, _url_templates=url_templates) for pk in pks]
+        return [
+            build(pk=pk, value=value, _url_templates=url_templates)
+            for pk, value in zip(pks, self.get_values(objects))
+        ]
 
 
 class TableSchema:
     _meta = None
+    _columns: tuple[Column, ...] = ()
+    _lookups: tuple[str, ...] = ()
+    _annotations: MappingProxyType = MappingProxyType({})
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._columns = tuple(
+            Column(name, getattr(cls, name))
+            for name in cls._get_attributes_list()
+        )
+        cls._lookups = tuple(
+            dict.fromkeys(
+                lookup for column in cls._columns for lookup in column.lookups
+            )
+        )
+        cls._annotations = MappingProxyType(
+            {
+                column.source: column.annotation
+                for column in cls._columns
+                if column.annotation is not None
+            }
+        )
 
     def __init__(
         self,
@@ -19,6 +162,7 @@ class TableSchema:
         request_kwargs: Optional[dict] = None,
     ) -> None:
         self.__table = Table()
+        self.__url_templates = UrlTemplates()
         if hasattr(self, "Meta"):
             self._meta = self.Meta()
         if request_params and type(request_params) is not QueryDict:
@@ -40,6 +184,10 @@ class TableSchema:
     def table(self) -> Table:
         return self.__table
 
+    @property
+    def columns(self) -> tuple[Column, ...]:
+        return self._columns
+
     def _add_header_cell(self, header: TableHeaderCell) -> None:
         self.__table.add_cell_to_header(header)
 
@@ -48,80 +196,110 @@ class TableSchema:
     ) -> None:
         self.__table.add_body_row(row)
 
-    def _get_attributes_list(self) -> list[str]:
-        if not self._meta or self._meta and not hasattr(self._meta, "index"):
+    @classmethod
+    def _get_attributes_list(cls) -> list[str]:
+        meta = getattr(cls, "Meta", None)
+        if not meta or not hasattr(meta, "index"):
             attributes = []
-            for attribute in dir(self):
+            for attribute in dir(cls):
                 if not attribute.startswith("__"):
-                    a = getattr(self, attribute, None)
+                    a = getattr(cls, attribute, None)
                     if not callable(a) and isinstance(a, Field):
                         attributes.append(attribute)
             return attributes
-        return getattr(self._meta, "index", None)
+        return list(meta.index)
 
     @classmethod
-    def _apply_converters(cls, value, converters):
-        converters = CellContentConverter(converters)
-        return converters.convert(value)
+    def get_lookups(cls) -> tuple[str, ...]:
+        return cls._lookups
 
-    def _create_table_data(self, queryset: QuerySet) -> Table:
-        attributes_list = self._get_attributes_list()
+    @classmethod
+    def select_columns(cls, queryset: QuerySet) -> QuerySet:
+        """Restrict the queryset to the columns the table renders"""
+        if cls._annotations:
+            queryset = queryset.annotate(**cls._annotations)
+        if not cls._lookups:
+            return queryset
+        opts = queryset.model._meta
+        related = []
+        for lookup in cls._lookups:
+            name, _, rest = lookup.partition(LOOKUP_SEP)
+            try:
+                field = opts.get_field(name)
+            except FieldDoesNotExist:
+                # Annotations and properties can't be narrowed by .only()
+                return queryset
+            if rest or field.is_relation:
+                relation = lookup.rpartition(LOOKUP_SEP)[0] if rest else name
+                if relation not in related:
+                    related.append(relation)
+        queryset = queryset.select_related(None)
+        if related:
+            queryset = queryset.select_related(*related)
+        return queryset.only(*cls._lookups)
 
-        for attribute_name in attributes_list:
-            field = getattr(self, attribute_name)
+    def _create_header(self) -> None:
+        for column in self._columns:
             kwargs = {
                 "_request_params": self._request_params,
                 "_request_kwargs": self._request_kwargs,
             }
-            if not field.name:
-                field.name = attribute_name
             if "order" not in kwargs["_request_kwargs"]:
                 kwargs["_request_kwargs"]["direction"] = "asc"
-                kwargs["_request_kwargs"]["order"] = field.name
-            kwargs.update(field.to_dict())
+                kwargs["_request_kwargs"]["order"] = column.field.name
+            kwargs.update(column.kwargs)
             self._add_header_cell(factory.create("header_cell", **kwargs))
-        for obj in queryset:
-            pk = getattr(obj, "pk", None)
-            row = []
-            for attribute in attributes_list:
-                field = getattr(self, attribute)
-                kwargs = {"pk": pk}
-                kwargs.update(field.to_dict())
-                if isinstance(field, ButtonsField):
-                    kwargs["buttons"] = field.buttons
-                    cell = factory.create("buttons_cell", **kwargs)
-                else:
-                    value = getattr(obj, attribute)
-                    converters = field.converters
-                    if converters:
-                        value = self._apply_converters(value, converters)
-                    kwargs["value"] = value
-                    cell = factory.create("body_cell", **kwargs)
-                row.append(cell)
+
+    def _create_table_data(self, queryset: QuerySet) -> Table:
+        self._create_header()
+        for row in self.get_body_rows(queryset):
             self._add_body_row(row)
 
         return self.table
 
-    def get_body_row(self, obj):
-        attributes_list = self._get_attributes_list()
-        pk = getattr(obj, "pk", None)
-        row = []
-        for attribute in attributes_list:
-            field = getattr(self, attribute)
-            kwargs = {"pk": pk}
-            kwargs.update(field.to_dict())
-            if isinstance(field, ButtonsField):
-                kwargs["buttons"] = field.buttons
-                cell = factory.create("buttons_cell", **kwargs)
-            else:
-                value = getattr(obj, attribute)
-                converters = field.converters
-                if converters:
-                    value = self._apply_converters(value, converters)
-                kwargs["value"] = value
-                cell = factory.create("body_cell", **kwargs)
-            row.append(cell)
-        return row
-
-    def make_table(self, queryset: QuerySet) -> Table:
+    def _create_streaming_table_data(
+        self, queryset: QuerySet, chunk_size: int
+    ) -> Table:
+        self._create_header()
+        self.__table.stream_body_rows(
+            self.iter_body_rows(queryset, chunk_size=chunk_size)
+        )
+        return self.table
+
+    def iter_body_rows(
+        self, queryset: Union[QuerySet, Iterable], chunk_size: int = 2000
+    ) -> Iterator[list[Cell]]:
+        if isinstance(queryset, QuerySet):
+            queryset = queryset.iterator(chunk_size=chunk_size)
+        objects = iter(queryset)
+        while chunk := list(islice(objects, chunk_size)):
+            yield from self.get_body_rows(chunk)
+
+    def get_body_rows(self, objects: Iterable) -> list[list[Cell]]:
+        """Build rows column by column, converting each column at once"""
+        objects = list(objects)
+        if not self._columns:
+            return [[] for _ in objects]
+        pks = [getattr(obj, "pk", None) for obj in objects]
+        columns = [
+            column.make_cells(pks, objects, self.__url_templates)
+            for column in self._columns
+        ]
+        return [list(row) for row in zip(*columns)]
+
+    def get_body_row(self, obj) -> list[Cell]:
+        return self.get_body_rows((obj,))[0]
+
+    def make_header(self) -> Table:
+        self._create_header()
+        return self.table
+
+    def make_table(
+        self,
+        queryset: QuerySet,
+        streaming: bool = False,
+        chunk_size: int = 2000,
+    ) -> Table:
+        if streaming:
+            return self._create_streaming_table_data(queryset, chunk_size)
         return self._create_table_data(queryset)
@@ -1,11 +1,27 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest.mock import Mock, patch
+from urllib.parse import quote_plus
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import Value
+from django.db.models.functions import Concat, Upper
+from django.http import QueryDict
 from django.test import TestCase
 from django.urls import reverse
 from parameterized import parameterized
 
-from tables import buttons, fields
-from tables.builders import TableHeaderCellBuilder
-from tables.cells import TableHeaderCell
+from hospitalizations.models import Hospitalization
+from tables import buttons, converters, fields, pagination, schemas
+from tables.builders import TableHeaderCellBuilder, get_sorting_urls
+from tables.cache import TableCache, get_object_version
+from tables.cells import TableBodyCell, TableButtonsCell, TableHeaderCell
 from tables.html import HTMLAttributes
+from tables.management.commands import bench_tables
+from tables.url_templates import UrlTemplate, UrlTemplates
 
 
 class TableHeaderCellTestCase(TestCase):
@@ -44,6 +60,41 @@ class TableHeaderCellTestCase(TestCase):
         self.assertEqual(cell.visible, visible)
 
 
+class TableCellsTestCase(TestCase):
+    def test_cells_have_no_instance_dict(self):
+        cells = (
+            TableHeaderCell(_name="surname"),
+            TableBodyCell(pk=1, value="value"),
+            TableButtonsCell(pk=1, buttons=[]),
+        )
+        for cell in cells:
+            self.assertFalse(hasattr(cell, "__dict__"))
+
+    def test_to_dict_ok(self):
+        cell = TableBodyCell(
+            pk=1,
+            value="value",
+            _url="/url/",
+            _attrs_td=None,
+            _visible=False,
+            _default="default",
+        )
+        self.assertEqual(
+            cell.to_dict(),
+            {
+                "visible": False,
+                "attrs": None,
+                "pk": 1,
+                "url": "/url/",
+                "value": "value",
+            },
+        )
+        cell = TableHeaderCell(_name="surname", _asc_sorting_url="/asc/")
+        self.assertEqual(cell.to_dict()["name"], "Surname")
+        self.assertEqual(cell.to_dict()["sorting_field"], "surname")
+        self.assertEqual(cell.to_dict()["asc_sorting_url"], "/asc/")
+
+
 class TableHeaderCellBuilderTestCase(TestCase):
     @parameterized.expand(
         [
@@ -133,6 +184,47 @@ class TableHeaderCellBuilderTestCase(TestCase):
         result = builder(**params)
         self.assertIsInstance(result, TableHeaderCell)
 
+    def test_get_sorting_url_encoded(self):
+        builder = TableHeaderCellBuilder()
+        request_params = QueryDict(mutable=True)
+        request_params.update({"doctor": "3", "q": "Иванов & Ко"})
+        request_params.appendlist("doctor", "4")
+        result = builder(
+            _name="entry_date",
+            _view_name_th="hospitalizations:current",
+            _request_kwargs={"order": "notes", "direction": "desc"},
+            _request_params=request_params,
+        )
+        url = reverse(
+            "hospitalizations:current",
+            kwargs={"order": "entry_date", "direction": "asc"},
+        )
+        self.assertEqual(
+            result.asc_sorting_url,
+            f"{url}?doctor=3&doctor=4&q={quote_plus('Иванов & Ко')}",
+        )
+
+    def test_get_sorting_url_cached(self):
+        builder = TableHeaderCellBuilder()
+        params = {
+            "_name": "entry_date",
+            "_view_name_th": "hospitalizations:hospitalizations",
+            "_request_kwargs": {"pk": 1, "order": "notes", "direction": "asc"},
+            "_request_params": {"doctor": "3"},
+        }
+        get_sorting_urls.cache_clear()
+        with patch("tables.builders.reverse", wraps=reverse) as mock_reverse:
+            first = builder(**params)
+            params["_request_kwargs"]["direction"] = "desc"
+            second = builder(**params)
+            params["_request_kwargs"]["pk"] = 2
+            third = builder(**params)
+        self.assertEqual(mock_reverse.call_count, 4)
+        self.assertEqual(first.asc_sorting_url, second.asc_sorting_url)
+        self.assertEqual(first.desc_sorting_url, second.desc_sorting_url)
+        self.assertNotEqual(first.asc_sorting_url, third.asc_sorting_url)
+        self.assertEqual(get_sorting_urls.cache_info().hits, 1)
+
 
 class TextFieldTestCase(TestCase):
     @parameterized.expand(
@@ -486,3 +578,393 @@ class ButtonsFieldTestCase(TestCase):
     def test_buttons_field_error(self, param):
         with self.assertRaises(TypeError):
             field = fields.ButtonsField(buttons=param)
+
+
+class SchemaObject:
+    def __init__(self, pk, surname, notes):
+        self.pk = pk
+        self.surname = surname
+        self.notes = notes
+
+
+class IndexedTableSchema(schemas.TableSchema):
+    surname = fields.TextField(verbose_name="Фамилия")
+    notes = fields.TextField(default="нет")
+    actions = fields.ButtonsField(
+        buttons=[
+            buttons.DeleteButton(
+                name="delete", view_name="hospitalizations:delete"
+            )
+        ]
+    )
+
+    class Meta:
+        index = ("notes", "surname", "actions")
+
+
+class NotIndexedTableSchema(schemas.TableSchema):
+    surname = fields.TextField()
+    notes = fields.TextField()
+
+
+class TableSchemaTestCase(TestCase):
+    def test_columns_compiled_once_per_class(self):
+        columns = IndexedTableSchema._columns
+        table = IndexedTableSchema(view_name="view", request_kwargs={})
+        self.assertIs(table.columns, columns)
+        table.make_table([SchemaObject(1, "Иванов", "")])
+        self.assertIs(IndexedTableSchema._columns, columns)
+
+    def test_columns_follow_meta_index(self):
+        names = [column.name for column in IndexedTableSchema._columns]
+        self.assertEqual(names, ["notes", "surname", "actions"])
+        self.assertEqual(IndexedTableSchema.notes.name, "notes")
+
+    def test_columns_without_meta_index(self):
+        names = [column.name for column in NotIndexedTableSchema._columns]
+        self.assertEqual(sorted(names), ["notes", "surname"])
+
+    def test_column_kwargs_frozen(self):
+        column = IndexedTableSchema._columns[0]
+        with self.assertRaises(TypeError):
+            column.kwargs["_default"] = "changed"
+
+    def test_get_body_row_ok(self):
+        table = IndexedTableSchema(view_name="view", request_kwargs={})
+        row = table.get_body_row(SchemaObject(7, "Иванов", ""))
+        self.assertEqual(len(row), 3)
+        self.assertIsInstance(row[0], TableBodyCell)
+        self.assertEqual(row[0].value, "нет")
+        self.assertEqual(row[1].value, "Иванов")
+        self.assertIsInstance(row[2], TableButtonsCell)
+        self.assertEqual(row[2].buttons[0].pk, 7)
+        self.assertEqual(
+            row[2].buttons[0].url,
+            reverse("hospitalizations:delete", kwargs={"pk": 7}),
+        )
+
+    def test_make_table_ok(self):
+        table = IndexedTableSchema(view_name="view", request_kwargs={})
+        result = table.make_table(
+            [SchemaObject(1, "Иванов", "a"), SchemaObject(2, "Петров", "b")]
+        )
+        self.assertEqual(len(result.header), 3)
+        self.assertEqual(result.header[1].name, "Фамилия")
+        self.assertEqual(len(result.body_rows), 2)
+        self.assertEqual(result.body_rows[1][1].value, "Петров")
+
+    def test_make_streaming_table_ok(self):
+        table = IndexedTableSchema(view_name="view", request_kwargs={})
+        result = table.make_table(
+            [SchemaObject(1, "Иванов", "a"), SchemaObject(2, "Петров", "b")],
+            streaming=True,
+        )
+        self.assertTrue(result.streaming)
+        self.assertEqual(len(result.header), 3)
+        self.assertNotIsInstance(result.body_rows, list)
+        rows = list(result.body_rows)
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][1].value, "Петров")
+        with self.assertRaises(TypeError):
+            result.add_body_row([])
+
+    def test_lookups_ok(self):
+        self.assertEqual(
+            IndexedTableSchema.get_lookups(), ("notes", "surname")
+        )
+        self.assertEqual(IndexedTableSchema._columns[2].lookups, ())
+
+    def test_lookups_from_converters(self):
+        class Converter(converters.Converter):
+            lookups = ("surname", "name")
+
+            def convert(self, value):
+                return value
+
+        class Schema(schemas.TableSchema):
+            patient = fields.TextField(converters=(Converter(),))
+            notes = fields.TextField()
+
+            class Meta:
+                index = ("patient", "notes", "patient")
+
+        self.assertEqual(
+            Schema.get_lookups(),
+            ("patient__surname", "patient__name", "notes"),
+        )
+
+
+class CountingConverter(converters.Converter):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def convert(self, value):
+        if value == "error":
+            raise ValueError("bad value")
+        self.calls.append(value)
+        return str(value).upper()
+
+    def annotate(self, name):
+        return Upper(f"{name}__surname")
+
+
+class ConvertersTestCase(TestCase):
+    def test_convert_many_memoised(self):
+        converter = CountingConverter()
+        cell_converter = converters.CellContentConverter([converter])
+        result = cell_converter.convert_many(["a", "b", "a", 1, True, "b"])
+        self.assertEqual(result, ["A", "B", "A", "1", "TRUE", "B"])
+        self.assertEqual(converter.calls, ["a", "b", 1, True])
+
+    def test_convert_many_unhashable(self):
+        converter = CountingConverter()
+        cell_converter = converters.CellContentConverter([converter])
+        result = cell_converter.convert_many([["a"], ["a"]])
+        self.assertEqual(result, ["['A']", "['A']"])
+        self.assertEqual(len(converter.calls), 2)
+
+    def test_convert_many_error(self):
+        cell_converter = converters.CellContentConverter([CountingConverter()])
+        with self.assertRaisesMessage(ValueError, "error"):
+            cell_converter.convert_many(["a", "error"])
+
+    def test_column_annotation(self):
+        class Schema(schemas.TableSchema):
+            patient = fields.TextField(converters=(CountingConverter(),))
+
+        column = Schema._columns[0]
+        self.assertEqual(column.source, "table_patient")
+        self.assertEqual(column.lookups, ())
+        self.assertIn("table_patient", Schema._annotations)
+
+        obj = SchemaObject(1, "", "")
+        obj.patient = "from attribute"
+        self.assertEqual(column.get_value(obj), "FROM ATTRIBUTE")
+        obj.table_patient = "FROM ANNOTATION"
+        self.assertEqual(column.get_value(obj), "FROM ANNOTATION")
+        self.assertEqual(
+            column.converter._converters[0].calls, ["from attribute"]
+        )
+
+    def test_column_annotation_not_idempotent(self):
+        class Exclaim(converters.Converter):
+            def convert(self, value):
+                return f"{value}!"
+
+            def annotate(self, name):
+                return Concat(f"{name}__surname", Value("!"))
+
+        class Schema(schemas.TableSchema):
+            patient = fields.TextField(
+                converters=(Exclaim(), CountingConverter())
+            )
+
+        column = Schema._columns[0]
+        annotated = SchemaObject(1, "", "")
+        annotated.table_patient = "Иванов!"
+        plain = SchemaObject(2, "", "")
+        plain.patient = "Петров"
+        self.assertEqual(
+            column.get_values((annotated, plain, annotated)),
+            ["ИВАНОВ!", "ПЕТРОВ!", "ИВАНОВ!"],
+        )
+        self.assertEqual(column.get_value(annotated), "ИВАНОВ!")
+
+
+class UrlTemplateTestCase(TestCase):
+    @parameterized.expand(
+        [
+            ("hospitalizations:documents", 1),
+            ("hospitalizations:leave", 25),
+            ("hospitalizations:delete_current", 1024),
+        ]
+    )
+    def test_url_template_ok(self, view_name, pk):
+        template = UrlTemplate(view_name)
+        self.assertEqual(template(pk), reverse(view_name, kwargs={"pk": pk}))
+
+    @parameterized.expand([("",), (None,)])
+    def test_url_template_error(self, view_name):
+        with self.assertRaises(ValueError):
+            UrlTemplate(view_name)
+
+    def test_url_templates_reversed_once(self):
+        templates = UrlTemplates()
+        template = templates["hospitalizations:leave"]
+        self.assertIs(templates["hospitalizations:leave"], template)
+        self.assertEqual(len(templates), 1)
+
+
+class BoundButtonTestCase(TestCase):
+    def test_bind_ok(self):
+        button = buttons.DeleteButton(
+            name="delete",
+            view_name="hospitalizations:delete",
+            confirm_message="message",
+        )
+        bound = button.bind(5)
+        self.assertEqual(bound.pk, 5)
+        self.assertIsNone(button.pk)
+        self.assertEqual(
+            bound.url, reverse("hospitalizations:delete", kwargs={"pk": 5})
+        )
+        self.assertEqual(bound.name, "delete")
+        self.assertEqual(bound.confirm_message, "message")
+        self.assertEqual(bound.template_name, button.template_name)
+
+    def test_bind_with_url_template_ok(self):
+        button = buttons.LeaveButton(view_name="hospitalizations:leave")
+        template = UrlTemplate("hospitalizations:leave")
+        self.assertEqual(button.bind(3, template).url, template(3))
+
+    def test_bound_buttons_share_button(self):
+        table = IndexedTableSchema(view_name="view", request_kwargs={})
+        first = table.get_body_row(SchemaObject(1, "Иванов", ""))[2]
+        second = table.get_body_row(SchemaObject(2, "Петров", ""))[2]
+        self.assertIs(first.buttons[0].button, second.buttons[0].button)
+        self.assertNotEqual(first.buttons[0].url, second.buttons[0].url)
+
+
+class KeysetPaginatorTestCase(TestCase):
+    fixtures = [
+        "patients_patient.json",
+        "users_user.json",
+        "hospitalizations_hospitalization.json",
+    ]
+
+    @parameterized.expand(
+        [
+            (None, "patient__surname", False),
+            ("entry_date", "entry_date", False),
+            ("-entry_date", "entry_date", True),
+            ("leaving_date", "leaving_date", False),
+            ("-leaving_date", "leaving_date", True),
+            ("patient", "patient__surname", False),
+            ("-patient", "patient__surname", True),
+            ("-notes", "notes", True),
+            ("pk", "pk", False),
+            ("-id", "pk", True),
+        ]
+    )
+    def test_get_page_ok(self, order, lookup, descending):
+        queryset = Hospitalization.objects.all()
+        if order:
+            queryset = queryset.order_by(order)
+        expected = [
+            obj.pk
+            for obj in pagination.KeysetPaginator(queryset, 100)
+            .get_page()
+            .objects
+        ]
+        self.assertEqual(len(expected), Hospitalization.objects.count())
+
+        paginator = pagination.KeysetPaginator(queryset, 2)
+        self.assertEqual(paginator.lookup, lookup)
+        self.assertEqual(paginator.descending, descending)
+        result, cursor = [], None
+        while True:
+            page = paginator.get_page(cursor)
+            self.assertLessEqual(len(page.objects), 2)
+            result += [obj.pk for obj in page.objects]
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(result, expected)
+
+    @parameterized.expand([("bad",), ("",), (None,)])
+    def test_invalid_cursor_error(self, cursor):
+        paginator = pagination.KeysetPaginator(
+            Hospitalization.objects.all(), 2
+        )
+        if not cursor:
+            self.assertEqual(len(paginator.get_page(cursor).objects), 2)
+            return
+        with self.assertRaises(pagination.InvalidCursor):
+            paginator.get_page(cursor)
+
+    def test_cursor_of_another_ordering_error(self):
+        cursor = (
+            pagination.KeysetPaginator(Hospitalization.objects.all(), 1)
+            .get_page()
+            .next_cursor
+        )
+        paginator = pagination.KeysetPaginator(
+            Hospitalization.objects.order_by("entry_date"), 1
+        )
+        with self.assertRaises(pagination.InvalidCursor):
+            paginator.get_page(cursor)
+
+    def test_per_page_error(self):
+        with self.assertRaises(ValueError):
+            pagination.KeysetPaginator(Hospitalization.objects.all(), 0)
+
+
+class TableCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_make_key_ok(self):
+        table_cache = TableCache()
+        key = table_cache.make_key(IndexedTableSchema, "a", {"order": "x"})
+        self.assertTrue(key.startswith("tables:tables.tests."))
+        self.assertEqual(
+            key, table_cache.make_key(IndexedTableSchema, "a", {"order": "x"})
+        )
+        self.assertNotEqual(
+            key, table_cache.make_key(IndexedTableSchema, "a", {"order": "y"})
+        )
+        self.assertNotEqual(
+            key,
+            table_cache.make_key(NotIndexedTableSchema, "a", {"order": "x"}),
+        )
+
+    def test_get_or_render_ok(self):
+        table_cache = TableCache()
+        render = Mock(return_value="<table></table>")
+        for _ in range(3):
+            html = table_cache.get_or_render("key", render)
+            self.assertEqual(html, "<table></table>")
+        render.assert_called_once()
+
+    def test_get_object_version_ok(self):
+        obj = SchemaObject(1, "Иванов", "")
+        obj.patient = SchemaObject(2, "Петров", "notes")
+        self.assertEqual(
+            get_object_version(obj, ("surname", "patient__notes", "unknown")),
+            ("Иванов", "notes", None),
+        )
+
+
+class BenchTablesCommandTestCase(TestCase):
+    def test_bench_tables_ok(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / "result.json"
+            call_command(
+                "bench_tables",
+                sizes=[5, 10],
+                repeat=1,
+                output=str(output),
+                label="test",
+                stdout=StringIO(),
+            )
+            data = json.loads(output.read_text())
+        self.assertEqual(data["label"], "test")
+        self.assertEqual(len(data["results"]), 12)
+        for result in data["results"]:
+            self.assertIn(result["rows"], (5, 10))
+            self.assertGreater(result["rows_per_sec"], 0)
+            self.assertGreater(result["peak_memory"], 0)
+            self.assertIn("allocations", result)
+
+    def test_bench_tables_dataset(self):
+        objects = bench_tables.make_dataset(10)
+        self.assertEqual(len(objects), 10)
+        table = bench_tables.CurrentHospitalizationsTable(
+            view_name="hospitalizations:current", request_kwargs={}
+        ).make_table(objects)
+        self.assertEqual(len(table.body_rows), 10)
+        self.assertEqual(
+            {len(row) for row in table.body_rows}, {len(table.header)}
+        )
+        self.assertEqual(table.body_rows[0][0].value, objects[0].table_patient)
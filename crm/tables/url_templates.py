@@ -0,0 +1,34 @@
+from django.urls import reverse
+
+
+class UrlTemplate:
+    placeholder = "0123456789"
+
+    def __init__(self, view_name: str) -> None:
+        if not view_name:
+            raise ValueError("'view_name' can't be an empty or None type")
+        url = reverse(view_name, args=[self.placeholder])
+        if url.count(self.placeholder) != 1:
+            raise ValueError(
+                f'Unable to build url template for "{view_name}" - {url}'
+            )
+        self.__view_name = view_name
+        self.__prefix, self.__suffix = url.split(self.placeholder)
+
+    @property
+    def view_name(self) -> str:
+        return self.__view_name
+
+    def format(self, pk) -> str:
+        return f"{self.__prefix}{pk}{self.__suffix}"
+
+    def __call__(self, pk) -> str:
+        return self.format(pk)
+
+
+class UrlTemplates(dict):
+    """Url templates of a single table render, reversed on first use"""
+
+    def __missing__(self, view_name: str) -> UrlTemplate:
+        template = self[view_name] = UrlTemplate(view_name)
+        return template
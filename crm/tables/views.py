@@ -1,17 +1,182 @@
-class TableView:
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        table = self.table_schema(
+from itertools import islice
+
+from django.db.models import QuerySet
+from django.http import Http404, StreamingHttpResponse
+from django.template import loader
+
+from tables.cache import TableCache, get_object_version, get_queryset_version
+from tables.pagination import InvalidCursor, KeysetPaginator
+
+
+class TableCacheMixin:
+    table_cache = False
+    table_cache_alias = "default"
+    table_cache_timeout = 60 * 60
+    table_cache_version_fields = ("time_update",)
+    table_cache_key = None
+
+    def get_table_cache(self):
+        return TableCache(self.table_cache_alias, self.table_cache_timeout)
+
+    def get_table_cache_key(self, template_name, version):
+        return self.get_table_cache().make_key(
+            self.table_schema,
+            template_name,
+            getattr(self, "table_view_name", None),
+            sorted(self.kwargs.items()),
+            sorted(self.request.GET.lists()),
+            getattr(self, "table_paginate_by", None),
+            version,
+        )
+
+
+class TableView(TableCacheMixin):
+    table_streaming = False
+    table_chunk_size = 500
+    table_rows_template_name = "tables/rows.html"
+    table_select_columns = True
+    table_paginate_by = None
+    table_cursor_param = "after"
+    table_page_template_name = "tables/page.html"
+    table_template_name = "tables/table.html"
+
+    def get_table_queryset(self):
+        queryset = self.get_queryset()
+        if self.table_select_columns and isinstance(queryset, QuerySet):
+            queryset = self.table_schema.select_columns(queryset)
+        return queryset
+
+    def get_table_schema(self):
+        request_params = self.request.GET
+        if self.table_paginate_by:
+            request_params = request_params.copy()
+            request_params.pop(self.table_cursor_param, None)
+        return self.table_schema(
             view_name=getattr(self, "table_view_name", None),
-            request_params=self.request.GET,
+            request_params=request_params,
             request_kwargs=self.kwargs,
         )
-        context["table"] = table.make_table(self.get_queryset())
+
+    def get_table_context(self, queryset):
+        context = {}
+        if self.table_paginate_by and isinstance(queryset, QuerySet):
+            page = self.paginate_table_queryset(queryset)
+            queryset = page.objects
+            context["table_next_url"] = self.get_table_next_url(page)
+        context["table"] = self.get_table_schema().make_table(
+            queryset,
+            streaming=self.is_table_streaming(),
+            chunk_size=self.table_chunk_size,
+        )
         return context
 
+    def get_table_fragment_template_name(self):
+        if self.is_table_page_request():
+            return self.table_page_template_name
+        return self.table_template_name
 
-class TableRowView:
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        queryset = self.get_table_queryset()
+        self.table_cache_key = None
+        if (
+            self.table_cache
+            and not self.is_table_streaming()
+            and isinstance(queryset, QuerySet)
+        ):
+            self.table_cache_key = self.get_table_cache_key(
+                self.get_table_fragment_template_name(),
+                get_queryset_version(
+                    queryset, self.table_cache_version_fields
+                ),
+            )
+            html = self.get_table_cache().get(self.table_cache_key)
+            if html is not None:
+                context["table_html"] = html
+                context["table"] = self.get_table_schema().make_header()
+                return context
+        context.update(self.get_table_context(queryset))
+        return context
+
+    def paginate_table_queryset(self, queryset):
+        paginator = KeysetPaginator(queryset, self.table_paginate_by)
+        try:
+            return paginator.get_page(
+                self.request.GET.get(self.table_cursor_param)
+            )
+        except InvalidCursor as ex:
+            raise Http404(str(ex))
+
+    def get_table_next_url(self, page):
+        if not page.has_next:
+            return None
+        params = self.request.GET.copy()
+        params[self.table_cursor_param] = page.next_cursor
+        return f"{self.request.path}?{params.urlencode()}"
+
+    def is_table_streaming(self):
+        # A page of a paginated table is small, so it is rendered at once
+        return bool(self.table_streaming and not self.table_paginate_by)
+
+    def is_table_page_request(self):
+        return bool(
+            self.table_paginate_by
+            and self.table_cursor_param in self.request.GET
+        )
+
+    def render_to_response(self, context, **response_kwargs):
+        if self.table_cache_key and "table_html" not in context:
+            # The fragment needs the complete context of the page (order,
+            # direction), so it is rendered and stored here
+            context["table_html"] = loader.render_to_string(
+                self.get_table_fragment_template_name(), context, self.request
+            )
+            self.get_table_cache().set(
+                self.table_cache_key, context["table_html"]
+            )
+        if self.is_table_page_request():
+            response_kwargs.setdefault("content_type", self.content_type)
+            return self.response_class(
+                request=self.request,
+                template=[self.table_page_template_name],
+                context=context,
+                using=self.template_engine,
+                **response_kwargs,
+            )
+        response = super().render_to_response(context, **response_kwargs)
+        table = context.get("table")
+        if table is None or not table.streaming:
+            return response
+        return self._stream_table(response, table)
+
+    def _iter_table_content(self, head, table, tail):
+        template = loader.get_template(self.table_rows_template_name)
+        rows = iter(table.body_rows)
+        yield head
+        while chunk := list(islice(rows, self.table_chunk_size)):
+            yield template.render({"rows": chunk}, self.request)
+        yield tail
+
+    def _stream_table(self, response, table):
+        content = response.rendered_content
+        if table.rows_marker not in content:
+            # The template renders the rows itself, so the response is sent
+            # as rendered
+            response.content = content
+            return response
+        head, tail = content.split(table.rows_marker, 1)
+        streaming_response = StreamingHttpResponse(
+            self._iter_table_content(head, table, tail),
+            status=response.status_code,
+        )
+        for header, value in response.items():
+            streaming_response[header] = value
+        return streaming_response
+
+
+class TableRowView(TableCacheMixin):
     template_name = "tables/tr.html"
+    table_cached_template_name = "tables/cached.html"
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -20,7 +185,23 @@ class TableRowView:
             request_params=self.request.GET,
             request_kwargs=self.kwargs,
         )
-        context["object"] = table.get_body_row(self.get_queryset())
+        obj = self.get_queryset()
+        if not self.table_cache:
+            context["object"] = table.get_body_row(obj)
+            return context
+        key = self.get_table_cache_key(
+            self.template_name,
+            get_object_version(obj, self.table_cache_version_fields),
+        )
+        context["table_html"] = self.get_table_cache().get_or_render(
+            key,
+            lambda: loader.render_to_string(
+                self.template_name,
+                {"object": table.get_body_row(obj)},
+                self.request,
+            ),
+        )
+        self.template_name = self.table_cached_template_name
         return context
 
 
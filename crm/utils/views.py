@@ -1,6 +1,10 @@
 from file_downloader.views import (
+    DownloadFileCsvView,
     DownloadFileDocxView,
     DownloadFileXlsxView,
+    DownloadFileZipView,
+    OutputStoreMetricsView,
+    TaskEventsView,
     TaskStatusView,
 )
 from htmx.http import RenderPartial
@@ -19,7 +23,31 @@ class DownloadFileXlsxAuthorizedView(
     pass
 
 
+class DownloadFileCsvAuthorizedView(
+    LoginRequiredMixin, RenderPartial, DownloadFileCsvView
+):
+    pass
+
+
+class DownloadFileZipAuthorizedView(
+    LoginRequiredMixin, RenderPartial, DownloadFileZipView
+):
+    pass
+
+
 class TaskStatusAuthorizedView(
     LoginRequiredMixin, RenderPartial, TaskStatusView
 ):
     pass
+
+
+class TaskEventsAuthorizedView(
+    LoginRequiredMixin, RenderPartial, TaskEventsView
+):
+    pass
+
+
+class OutputStoreMetricsAuthorizedView(
+    LoginRequiredMixin, RenderPartial, OutputStoreMetricsView
+):
+    pass
@@ -0,0 +1,3 @@
+#!/bin/bash
+
+celery -A crm beat -l info
\ No newline at end of file
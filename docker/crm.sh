@@ -22,5 +22,11 @@ echo "Loading data"
 python manage.py loaddata db.json
 
 # Start gunicorn
+# Task events, streamed tables and inline builds hold a thread each
 echo "Starting gunicorn"
-gunicorn crm.wsgi:application --workers 1 --bind=0.0.0.0:8000 --timeout 90
\ No newline at end of file
+gunicorn crm.wsgi:application \
+    --workers ${GUNICORN_WORKERS:-4} \
+    --worker-class gthread \
+    --threads ${GUNICORN_THREADS:-16} \
+    --bind=0.0.0.0:8000 \
+    --timeout 90
\ No newline at end of file